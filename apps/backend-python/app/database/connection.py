@@ -2,14 +2,24 @@
 Database connection and session management
 """
 
+import asyncio
+import time
 from sqlalchemy import create_engine, text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, declarative_base
 from sqlalchemy.pool import NullPool
+from fastapi import Depends
 import asyncpg
 from loguru import logger
 
 from app.config.settings import settings
+from app.middleware.auth import get_current_user
+from app.database.pool_metrics import InstrumentedAsyncQueuePool, get_pool_stats
+from app.database.prepared_statements import prepared_statements
+from app.database.query_stats import instrument_engine
+from app.database import slow_queries
+from app.database.replica import replica_router
+from app.database.partitions import maintain_actividades_partitions
 
 # SQLAlchemy Base
 Base = declarative_base()
@@ -17,58 +27,144 @@ Base = declarative_base()
 # Database engines
 engine = None
 async_engine = None
+replica_engine = None
 SessionLocal = None
 AsyncSessionLocal = None
 
 # Database URL for asyncpg
 async_database_url = settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://")
+async_replica_url = settings.DATABASE_REPLICA_URL.replace("postgresql://", "postgresql+asyncpg://")
+
+
+def _async_pool_options() -> dict:
+    """Pool arguments for the async engine, driven by settings"""
+    if settings.DATABASE_USE_NULL_POOL:
+        return {"poolclass": NullPool}
+
+    return {
+        "poolclass": InstrumentedAsyncQueuePool,
+        "pool_size": settings.DATABASE_POOL_SIZE,
+        "max_overflow": settings.DATABASE_MAX_OVERFLOW,
+        "pool_timeout": settings.DATABASE_POOL_TIMEOUT,
+        "pool_recycle": settings.DATABASE_POOL_RECYCLE,
+        "pool_pre_ping": settings.DATABASE_POOL_PRE_PING,
+    }
+
+
+def _capture_slow_queries(engine_to_watch):
+    slow_queries.slow_query_log.capacity = settings.SLOW_QUERY_BUFFER_SIZE
+    slow_queries.instrument_engine(
+        engine_to_watch,
+        threshold_ms=settings.SLOW_QUERY_THRESHOLD_MS,
+        explain=settings.SLOW_QUERY_EXPLAIN,
+        explain_timeout_ms=settings.SLOW_QUERY_EXPLAIN_TIMEOUT_MS
+    )
+
+
+async def _ensure_extensions():
+    """Create required extensions only when pg_extension says they are missing"""
+    required = [name.strip() for name in settings.DATABASE_REQUIRED_EXTENSIONS.split(",") if name.strip()]
+    
+    # Doubles as the connection test
+    async with async_engine.connect() as conn:
+        result = await conn.execute(
+            text("SELECT extname FROM pg_extension WHERE extname = ANY(:names)"),
+            {"names": required}
+        )
+        missing = [name for name in required if name not in set(result.scalars())]
+    
+    if not missing:
+        return
+    
+    # CREATE EXTENSION takes heavy catalog locks, so only when needed
+    async with async_engine.begin() as conn:
+        try:
+            for name in missing:
+                await conn.execute(text(f'CREATE EXTENSION IF NOT EXISTS "{name}"'))
+            logger.info(f"✅ Extensions enabled: {', '.join(missing)}")
+        except Exception as e:
+            logger.warning(f"PostGIS extension warning: {e}")
+
+
+async def _warm_pool() -> int:
+    """Open up to DATABASE_POOL_WARM_CONNECTIONS pool connections concurrently"""
+    if settings.DATABASE_USE_NULL_POOL:
+        return 0
+    
+    count = min(settings.DATABASE_POOL_WARM_CONNECTIONS, settings.DATABASE_POOL_SIZE)
+    if count <= 0:
+        return 0
+    
+    connections = await asyncio.gather(
+        *(async_engine.connect().start() for _ in range(count)),
+        return_exceptions=True
+    )
+    opened = 0
+    for conn in connections:
+        if isinstance(conn, Exception):
+            logger.warning(f"Pool warm-up connection failed: {conn}")
+            continue
+        await conn.close()
+        opened += 1
+    return opened
+
+
+def get_sync_engine():
+    """Sync engine, created on first use (few code paths need it)"""
+    global engine, SessionLocal
+    
+    if engine is None:
+        engine = create_engine(
+            settings.DATABASE_URL,
+            echo=settings.DATABASE_ECHO,
+            pool_pre_ping=settings.DATABASE_POOL_PRE_PING,
+            pool_recycle=settings.DATABASE_POOL_RECYCLE
+        )
+        SessionLocal = sessionmaker(
+            autocommit=False,
+            autoflush=False,
+            bind=engine
+        )
+    return engine
 
 
 async def init_db():
     """Initialize database connection"""
-    global engine, async_engine, SessionLocal, AsyncSessionLocal
+    global async_engine, AsyncSessionLocal
     
+    started = time.perf_counter()
     try:
         # Create async engine
         async_engine = create_async_engine(
             async_database_url,
-            echo=settings.DEBUG,
-            poolclass=NullPool if settings.DEBUG else None
+            echo=settings.DATABASE_ECHO,
+            **_async_pool_options()
         )
         
-        # Create sync engine for certain operations
-        engine = create_engine(
-            settings.DATABASE_URL,
-            echo=settings.DEBUG
-        )
+        if settings.DATABASE_PREPARED_STATEMENTS:
+            prepared_statements.attach(async_engine)
+        
+        if settings.DB_QUERY_STATS_ENABLED:
+            instrument_engine(async_engine)
+        
+        if settings.SLOW_QUERY_CAPTURE_ENABLED:
+            _capture_slow_queries(async_engine)
         
-        # Create session makers
+        # Create session maker (the sync engine is created lazily by get_sync_engine)
         AsyncSessionLocal = async_sessionmaker(
             async_engine,
             class_=AsyncSession,
             expire_on_commit=False
         )
         
-        SessionLocal = sessionmaker(
-            autocommit=False,
-            autoflush=False,
-            bind=engine
-        )
+        await _ensure_extensions()
+        warmed = await _warm_pool()
         
-        # Test connection
-        async with async_engine.begin() as conn:
-            await conn.execute(text("SELECT 1"))
-            
-        # Enable PostGIS if not already enabled
-        async with async_engine.begin() as conn:
-            try:
-                await conn.execute(text("CREATE EXTENSION IF NOT EXISTS postgis"))
-                await conn.execute(text("CREATE EXTENSION IF NOT EXISTS postgis_topology"))
-                logger.info("✅ PostGIS extensions enabled")
-            except Exception as e:
-                logger.warning(f"PostGIS extension warning: {e}")
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        logger.info(f"✅ Database connection established in {elapsed_ms:.0f} ms ({warmed} pool connections pre-opened)")
         
-        logger.info("✅ Database connection established")
+        if async_replica_url:
+            await init_replica()
         
     except Exception as e:
         logger.warning(f"⚠️ Database connection failed: {e}")
@@ -76,14 +172,90 @@ async def init_db():
         # Continue without database for development
 
 
+async def init_replica():
+    """Initialize the read replica engine used by get_read_session"""
+    global replica_engine
+    
+    try:
+        replica_engine = create_async_engine(
+            async_replica_url,
+            echo=settings.DATABASE_ECHO,
+            **_async_pool_options()
+        )
+        
+        if settings.DATABASE_PREPARED_STATEMENTS:
+            prepared_statements.attach(replica_engine)
+        
+        if settings.DB_QUERY_STATS_ENABLED:
+            instrument_engine(replica_engine)
+        
+        if settings.SLOW_QUERY_CAPTURE_ENABLED:
+            _capture_slow_queries(replica_engine)
+        
+        async with replica_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        
+        replica_router.configure(
+            replica_engine,
+            async_sessionmaker(replica_engine, class_=AsyncSession, expire_on_commit=False),
+            max_lag_seconds=settings.DATABASE_REPLICA_MAX_LAG_SECONDS,
+            lag_check_interval=settings.DATABASE_REPLICA_LAG_CHECK_INTERVAL,
+            read_your_writes_seconds=settings.DATABASE_READ_YOUR_WRITES_SECONDS
+        )
+        replica_router.track_writes(async_engine)
+        logger.info("✅ Read replica connection established")
+        
+    except Exception as e:
+        logger.warning(f"⚠️ Read replica unavailable, reads will use the primary: {e}")
+        if replica_engine:
+            await replica_engine.dispose()
+        replica_engine = None
+
+
+async def warm_prepared_statements() -> int:
+    """Prepare the registered raw queries on a pooled connection"""
+    if not async_engine or not settings.DATABASE_PREPARED_STATEMENTS:
+        return 0
+    
+    try:
+        return await prepared_statements.warm(async_engine)
+    except Exception as e:
+        logger.warning(f"Prepared statement warm-up failed: {e}")
+        return 0
+
+
+async def maintain_partitions() -> dict:
+    """Create upcoming actividades partitions and detach expired ones"""
+    if not async_engine:
+        return {}
+    
+    try:
+        return await maintain_actividades_partitions(async_engine)
+    except Exception as e:
+        logger.warning(f"Partition maintenance failed: {e}")
+        return {}
+
+
+async def partition_maintenance_loop():
+    """Repeat partition maintenance so a new year or campaign never lands in the default partition"""
+    while True:
+        await asyncio.sleep(settings.ACTIVIDADES_PARTITION_MAINTENANCE_HOURS * 3600)
+        await maintain_partitions()
+
+
 async def close_db():
     """Close database connections"""
-    global engine, async_engine
+    global engine, async_engine, replica_engine
     
     if async_engine:
         await async_engine.dispose()
         logger.info("✅ Async database engine disposed")
     
+    if replica_engine:
+        replica_router.reset()
+        await replica_engine.dispose()
+        logger.info("✅ Replica database engine disposed")
+    
     if engine:
         engine.dispose()
         logger.info("✅ Sync database engine disposed")
@@ -104,11 +276,34 @@ async def get_async_session() -> AsyncSession:
             await session.close()
 
 
+async def get_read_session(current_user: dict = Depends(get_current_user)) -> AsyncSession:
+    """Get async session for read-only endpoints
+    
+    Served by the read replica when one is configured, its lag is under
+    DATABASE_REPLICA_MAX_LAG_SECONDS and the user has not written recently;
+    otherwise falls back to the primary.
+    """
+    if not AsyncSessionLocal:
+        raise RuntimeError("Database not initialized")
+    
+    session_factory = await replica_router.session_factory_for(current_user["id"]) or AsyncSessionLocal
+    
+    async with session_factory() as session:
+        try:
+            yield session
+        except Exception as e:
+            await session.rollback()
+            raise
+        finally:
+            await session.close()
+
+
 def get_session():
     """Get sync database session"""
-    if not SessionLocal:
+    if not async_engine:
         raise RuntimeError("Database not initialized")
     
+    get_sync_engine()
     db = SessionLocal()
     try:
         yield db
@@ -134,6 +329,11 @@ async def check_db_health() -> bool:
         return False
 
 
+def get_pool_info() -> dict:
+    """Get live connection pool counters (no database round trip)"""
+    return get_pool_stats(async_engine)
+
+
 async def get_db_info() -> dict:
     """Get database information"""
     try:
@@ -153,18 +353,14 @@ async def get_db_info() -> dict:
                 postgis = "Not available"
             
             # Get connection pool info
-            pool_info = {
-                "pool_size": "N/A",
-                "checked_in": "N/A",
-                "checked_out": "N/A",
-                "overflow": "N/A",
-            }
+            pool_info = get_pool_info()
             
             return {
                 "status": "connected",
                 "postgresql_version": version.split(" ")[1],
                 "postgis_version": postgis,
                 "pool_info": pool_info,
+                "replica": replica_router.info(),
                 "url": settings.DATABASE_URL.split("@")[1] if "@" in settings.DATABASE_URL else "localhost"
             }
             
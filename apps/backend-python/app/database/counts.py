@@ -0,0 +1,57 @@
+"""
+List totals - exact count(*), per-user counters or planner estimates
+
+``count=exact`` runs count(*) over the filtered query (the previous
+behaviour), ``count=none`` skips it, and ``count=estimated`` reads the
+counters kept by the migrations/0009 triggers for unfiltered lists, or the
+planner's row estimate when filters are applied.
+"""
+
+import json
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from app.database.prepared_statements import prepared_statements
+
+COUNTER_QUERY = prepared_statements.register("usuario_contador", """
+    SELECT total FROM usuario_contadores WHERE usuario_id = :user_id AND entidad = :entidad
+""")
+
+
+class _Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) of a statement, with its bind parameters processed as usual"""
+    
+    inherit_cache = False
+    
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(_Explain)
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+async def planner_estimate(db, query) -> int:
+    """Rows the planner expects ``query`` to return (no rows are read)"""
+    plan = (await db.execute(_Explain(query))).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def count_total(db, query, mode: str, user_id: str, entidad: str, filtered: bool) -> Optional[int]:
+    """Total for a list ``query`` in the requested count mode (None for count=none)"""
+    if mode == "none":
+        return None
+    
+    if mode == "estimated":
+        if not filtered:
+            total = (await db.execute(COUNTER_QUERY, {"user_id": user_id, "entidad": entidad})).scalar()
+            return max(total or 0, 0)
+        return await planner_estimate(db, query)
+    
+    return (await db.execute(select(func.count()).select_from(query.subquery()))).scalar()
\ No newline at end of file
@@ -0,0 +1,197 @@
+"""
+Versioned SQL migrations - ``migrations/NNNN_name.sql`` applied in order
+
+A migration whose first line is ``-- migrate: no-transaction`` runs one
+statement at a time in autocommit mode, which ``CREATE INDEX CONCURRENTLY``
+requires. Everything else runs inside a single transaction. Applied versions
+are recorded in ``schema_migrations``.
+"""
+
+import re
+from pathlib import Path
+from typing import List, NamedTuple
+
+import asyncpg
+from loguru import logger
+
+from app.config.settings import settings
+
+MIGRATIONS_DIR = Path(__file__).resolve().parents[2] / "migrations"
+NO_TRANSACTION_DIRECTIVE = "-- migrate: no-transaction"
+
+# Arbitrary key so only one process migrates at a time
+MIGRATION_LOCK_ID = 726_415_001
+
+_FILENAME = re.compile(r"^(\d{4})_(\w+)\.sql$")
+_DOLLAR_TAG = re.compile(r"\$[A-Za-z_]*\$")
+_CONCURRENT_INDEX = re.compile(
+    r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)", re.IGNORECASE
+)
+
+
+class Migration(NamedTuple):
+    version: str
+    name: str
+    sql: str
+    transactional: bool
+
+
+def discover_migrations(directory: Path = MIGRATIONS_DIR) -> List[Migration]:
+    """All migration files, ordered by version"""
+    migrations = []
+    for path in sorted(directory.glob("*.sql")):
+        match = _FILENAME.match(path.name)
+        if not match:
+            logger.warning(f"Ignoring migration with unexpected name: {path.name}")
+            continue
+        
+        sql = path.read_text(encoding="utf-8")
+        transactional = not sql.lstrip().startswith(NO_TRANSACTION_DIRECTIVE)
+        migrations.append(Migration(match.group(1), match.group(2), sql, transactional))
+    return migrations
+
+
+def split_statements(sql: str) -> List[str]:
+    """Split a script on top-level semicolons (quotes, $$ bodies and comments aware)"""
+    statements = []
+    current = []
+    i = 0
+    in_quote = False
+    dollar_tag = None
+    
+    while i < len(sql):
+        ch = sql[i]
+        
+        if dollar_tag:
+            if sql.startswith(dollar_tag, i):
+                current.append(dollar_tag)
+                i += len(dollar_tag)
+                dollar_tag = None
+                continue
+            current.append(ch)
+        elif in_quote:
+            current.append(ch)
+            if ch == "'":
+                in_quote = False
+        elif sql.startswith("--", i):
+            end = sql.find("\n", i)
+            i = len(sql) if end == -1 else end
+            continue
+        elif sql.startswith("/*", i):
+            end = sql.find("*/", i)
+            i = len(sql) if end == -1 else end + 2
+            continue
+        elif ch == "'":
+            in_quote = True
+            current.append(ch)
+        elif ch == "$" and _DOLLAR_TAG.match(sql, i):
+            dollar_tag = _DOLLAR_TAG.match(sql, i).group()
+            current.append(dollar_tag)
+            i += len(dollar_tag)
+            continue
+        elif ch == ";":
+            statement = "".join(current).strip()
+            if statement:
+                statements.append(statement)
+            current = []
+        else:
+            current.append(ch)
+        i += 1
+    
+    statement = "".join(current).strip()
+    if statement:
+        statements.append(statement)
+    return statements
+
+
+async def _ensure_migrations_table(conn: asyncpg.Connection):
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version VARCHAR(4) PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """)
+
+
+async def _drop_invalid_indexes(conn: asyncpg.Connection, sql: str):
+    """Remove leftovers of an interrupted CREATE INDEX CONCURRENTLY so it can be retried"""
+    names = _CONCURRENT_INDEX.findall(sql)
+    if not names:
+        return
+    
+    invalid = await conn.fetch("""
+        SELECT c.relname
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = ANY($1::text[]) AND NOT i.indisvalid
+    """, names)
+    
+    for row in invalid:
+        logger.warning(f"Dropping invalid index {row['relname']} left by an interrupted build")
+        await conn.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{row["relname"]}"')
+
+
+async def apply_migration(conn: asyncpg.Connection, migration: Migration):
+    if migration.transactional:
+        async with conn.transaction():
+            await conn.execute(migration.sql)
+            await conn.execute(
+                "INSERT INTO schema_migrations (version, name) VALUES ($1, $2)",
+                migration.version, migration.name
+            )
+        return
+    
+    await _drop_invalid_indexes(conn, migration.sql)
+    for statement in split_statements(migration.sql):
+        await conn.execute(statement)
+    await conn.execute(
+        "INSERT INTO schema_migrations (version, name) VALUES ($1, $2)",
+        migration.version, migration.name
+    )
+
+
+async def applied_versions(conn: asyncpg.Connection) -> set:
+    await _ensure_migrations_table(conn)
+    rows = await conn.fetch("SELECT version FROM schema_migrations")
+    return {row["version"] for row in rows}
+
+
+async def run_migrations(dsn: str = None, target: str = None) -> List[str]:
+    """Apply pending migrations (up to ``target`` if given); returns applied versions"""
+    conn = await asyncpg.connect(dsn or settings.DATABASE_URL)
+    applied = []
+    
+    try:
+        await conn.execute("SELECT pg_advisory_lock($1)", MIGRATION_LOCK_ID)
+        try:
+            done = await applied_versions(conn)
+            for migration in discover_migrations():
+                if migration.version in done:
+                    continue
+                if target and migration.version > target:
+                    break
+                
+                logger.info(f"⏳ Applying migration {migration.version}_{migration.name}")
+                await apply_migration(conn, migration)
+                applied.append(migration.version)
+                logger.info(f"✅ Migration {migration.version}_{migration.name} applied")
+        finally:
+            await conn.execute("SELECT pg_advisory_unlock($1)", MIGRATION_LOCK_ID)
+    finally:
+        await conn.close()
+    
+    return applied
+
+
+async def migration_status(dsn: str = None) -> List[dict]:
+    conn = await asyncpg.connect(dsn or settings.DATABASE_URL)
+    try:
+        done = await applied_versions(conn)
+    finally:
+        await conn.close()
+    
+    return [
+        {"version": m.version, "name": m.name, "applied": m.version in done}
+        for m in discover_migrations()
+    ]
@@ -0,0 +1,47 @@
+"""
+Keyset pagination - opaque cursors over (timestamp, id) for newest-first lists
+
+A cursor encodes the sort key of the last row of a page. The next page is
+``WHERE (ts, id) < (cursor ts, cursor id)``, which the (owner, ts, id)
+indexes from migrations/0008 answer without scanning skipped rows.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple, Union
+from uuid import UUID
+
+from sqlalchemy import tuple_
+
+
+def encode_cursor(moment: Union[datetime, str], row_id: Union[UUID, str]) -> str:
+    """Cursor for the row with timestamp ``moment`` and id ``row_id``"""
+    if isinstance(moment, datetime):
+        moment = moment.isoformat()
+    raw = json.dumps([moment, str(row_id)], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    """(timestamp, id) from a cursor; ValueError if it is malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        moment, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(moment), UUID(row_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def after_cursor(query, time_column, id_column, keyset: Tuple[datetime, UUID]):
+    """Restrict a newest-first query to the rows after ``keyset``"""
+    return query.where(tuple_(time_column, id_column) < tuple_(*keyset))
+
+
+def split_page(rows: List[dict], limit: int, time_key: str) -> Tuple[List[dict], Optional[str]]:
+    """Drop the look-ahead row (queries fetch limit + 1) and build the next cursor"""
+    if len(rows) <= limit:
+        return rows, None
+    
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1][time_key], rows[-1]["id"])
\ No newline at end of file
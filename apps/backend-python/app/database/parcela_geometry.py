@@ -0,0 +1,92 @@
+"""
+Parcela derived geometry - batched recompute of the columns the parcelas triggers maintain
+
+The trigger keeps these columns current for every write; this job fills rows
+written before it existed. A row whose ``geometria_hash`` matches its
+geometry is already up to date and is skipped, so only rows that change are
+updated. Each batch is its own short transaction, keyed by id, that sets
+cuaderno.recalculo so the updated_at trigger leaves the row alone
+(migrations/0011): derived columns are not a change sync clients need to
+pull again.
+"""
+
+import uuid
+from typing import Callable, Optional
+
+from sqlalchemy import text
+from loguru import logger
+
+PARCELAS_FILTER = """
+    (CAST(:user_id AS text) IS NULL OR propietario_id = CAST(:user_id AS text))
+    AND (CAST(:organizacion_id AS text) IS NULL OR organizacion_id = CAST(:organizacion_id AS text))
+"""
+
+COUNT_QUERY = text("SELECT count(*) FROM parcelas WHERE" + PARCELAS_FILTER)
+
+# Transaction-local, so it ends with the batch
+SKIP_UPDATED_AT = text("SELECT set_config('cuaderno.recalculo', 'on', true)")
+
+RECOMPUTE_BATCH_QUERY = text("""
+    WITH lote AS (
+        SELECT id FROM parcelas
+        WHERE id > CAST(:after AS uuid) AND""" + PARCELAS_FILTER + """
+        ORDER BY id
+        LIMIT CAST(:batch_size AS int)
+    ),
+    actualizadas AS (
+        -- Same values as the parcelas_derivar_geometria trigger (migrations/0007)
+        UPDATE parcelas p
+        SET superficie_calculada = ST_Area(p.geometria::geography) / 10000,
+            centroide = ST_PointOnSurface(p.geometria),
+            bbox = ST_Envelope(p.geometria),
+            num_vertices = ST_NPoints(p.geometria),
+            geometria_hash = md5(ST_AsEWKB(p.geometria))
+        FROM lote
+        WHERE p.id = lote.id
+            AND p.geometria IS NOT NULL
+            AND p.geometria_hash IS DISTINCT FROM md5(ST_AsEWKB(p.geometria))
+        RETURNING p.id
+    )
+    SELECT
+        (SELECT id FROM lote ORDER BY id DESC LIMIT 1) AS last_id,
+        (SELECT count(*) FROM lote) AS scanned,
+        (SELECT count(*) FROM actualizadas) AS updated
+""")
+
+
+def _log_progress(scanned: int, total: int, updated: int):
+    percent = 100 * scanned / total if total else 100
+    logger.info(f"⏳ Parcelas recomputed: {scanned}/{total} ({percent:.0f}%), {updated} changed")
+
+
+async def recompute_parcelas(
+    async_engine,
+    user_id: Optional[str] = None,
+    organizacion_id: Optional[str] = None,
+    batch_size: int = 500,
+    progress: Callable[[int, int, int], None] = _log_progress
+) -> dict:
+    """Recompute derived columns for all parcelas of a user, an organization or everyone"""
+    filters = {"user_id": user_id, "organizacion_id": organizacion_id}
+    
+    async with async_engine.connect() as conn:
+        total = (await conn.execute(COUNT_QUERY, filters)).scalar()
+    
+    after = uuid.UUID(int=0)
+    scanned = updated = 0
+    while True:
+        async with async_engine.begin() as conn:
+            await conn.execute(SKIP_UPDATED_AT)
+            batch = (await conn.execute(RECOMPUTE_BATCH_QUERY, {
+                **filters, "after": after, "batch_size": batch_size
+            })).one()
+        
+        if not batch.scanned:
+            break
+        
+        after = batch.last_id
+        scanned += batch.scanned
+        updated += batch.updated
+        progress(scanned, total, updated)
+    
+    return {"total": total, "scanned": scanned, "updated": updated}
\ No newline at end of file
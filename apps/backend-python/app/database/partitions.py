@@ -0,0 +1,170 @@
+"""
+Actividades partition maintenance - yearly or per-campaign range partitions on fecha
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from loguru import logger
+
+from app.config.settings import settings
+
+PARENT_TABLE = "actividades"
+DEFAULT_PARTITION = "actividades_default"
+
+# Arbitrary key so only one worker maintains partitions at a time
+PARTITION_LOCK_ID = 726_415_002
+
+IS_PARTITIONED_QUERY = text("""
+    SELECT EXISTS (
+        SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('actividades')
+    )
+""")
+
+PARTITIONS_QUERY = text(r"""
+    SELECT
+        c.relname AS name,
+        (regexp_match(pg_get_expr(c.relpartbound, c.oid), 'FROM \(''([^'']+)''\)'))[1]::timestamptz AS lower_bound,
+        (regexp_match(pg_get_expr(c.relpartbound, c.oid), 'TO \(''([^'']+)''\)'))[1]::timestamptz AS upper_bound
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = 'actividades'::regclass
+""")
+
+# Periods (by starting year) that still have rows parked in the default partition
+DEFAULT_PARTITION_PERIODS_QUERY = text("""
+    SELECT DISTINCT EXTRACT(YEAR FROM (fecha AT TIME ZONE 'UTC') - make_interval(months => :shift))::int AS year
+    FROM actividades_default
+""")
+
+# Checked by the actividades_contar trigger (migrations/0010): rows moved out
+# of the default partition must not change the per-user counters
+HAS_COUNTERS_QUERY = text("SELECT to_regclass('usuario_contadores') IS NOT NULL")
+PAUSE_COUNTERS = text("SELECT set_config('cuaderno.contadores_pausados', 'on', true)")
+RESUME_COUNTERS = text("SELECT set_config('cuaderno.contadores_pausados', 'off', true)")
+
+Period = Tuple[datetime, datetime, str]
+
+
+def period_for(moment: datetime, interval: str = None, campaign_start_month: int = None) -> Period:
+    """(start, end, partition name) of the period containing ``moment``"""
+    interval = interval or settings.ACTIVIDADES_PARTITION_INTERVAL
+    start_month = campaign_start_month or settings.ACTIVIDADES_CAMPAIGN_START_MONTH
+    
+    if interval == "year":
+        start = datetime(moment.year, 1, 1, tzinfo=timezone.utc)
+        return start, start.replace(year=moment.year + 1), f"{PARENT_TABLE}_{moment.year}"
+    
+    if interval == "campaign":
+        year = moment.year if moment.month >= start_month else moment.year - 1
+        start = datetime(year, start_month, 1, tzinfo=timezone.utc)
+        return start, start.replace(year=year + 1), f"{PARENT_TABLE}_{year}_{(year + 1) % 100:02d}"
+    
+    raise ValueError(f"Unknown partition interval: {interval}")
+
+
+def _period_start_month() -> int:
+    return settings.ACTIVIDADES_CAMPAIGN_START_MONTH if settings.ACTIVIDADES_PARTITION_INTERVAL == "campaign" else 1
+
+
+async def _create_partition(conn, start: datetime, end: datetime, name: str):
+    """Create a partition, moving any matching rows out of the default partition first"""
+    await conn.exec_driver_sql(
+        f'CREATE TABLE "{name}" (LIKE {PARENT_TABLE} '
+        f'INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE)'
+    )
+    await conn.execute(PAUSE_COUNTERS)
+    await conn.execute(text(f"""
+        WITH moved AS (
+            DELETE FROM {DEFAULT_PARTITION}
+            WHERE fecha >= :start AND fecha < :end
+            RETURNING *
+        )
+        INSERT INTO "{name}" SELECT * FROM moved
+    """), {"start": start, "end": end})
+    await conn.execute(RESUME_COUNTERS)
+    await conn.exec_driver_sql(
+        f'ALTER TABLE {PARENT_TABLE} ATTACH PARTITION "{name}" '
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+
+
+async def _ensure_partitions(conn, now: datetime) -> List[str]:
+    existing = (await conn.execute(PARTITIONS_QUERY)).all()
+    covered = {row.lower_bound for row in existing if row.lower_bound is not None}
+    
+    wanted = []
+    moment = now
+    for _ in range(settings.ACTIVIDADES_PARTITIONS_AHEAD + 1):
+        period = period_for(moment)
+        wanted.append(period)
+        moment = period[1]
+    
+    start_month = _period_start_month()
+    years = (await conn.execute(DEFAULT_PARTITION_PERIODS_QUERY, {"shift": start_month - 1})).scalars().all()
+    wanted.extend(period_for(datetime(year, start_month, 1, tzinfo=timezone.utc)) for year in years)
+    
+    created = []
+    for start, end, name in sorted(set(wanted)):
+        if start in covered:
+            continue
+        try:
+            async with conn.begin_nested():
+                await _create_partition(conn, start, end, name)
+            created.append(name)
+        except Exception as e:
+            # e.g. overlapping ranges after switching between year and campaign
+            logger.warning(f"Could not create partition {name}: {e}")
+    return created
+
+
+async def _detach_old_partitions(conn, now: datetime) -> List[str]:
+    retention = settings.ACTIVIDADES_PARTITION_RETENTION
+    if retention <= 0:
+        return []
+    
+    cutoff = period_for(now)[0]
+    for _ in range(retention - 1):
+        cutoff = period_for(cutoff - timedelta(days=1))[0]
+    
+    has_counters = (await conn.execute(HAS_COUNTERS_QUERY)).scalar()
+    detached = []
+    for row in (await conn.execute(PARTITIONS_QUERY)).all():
+        if row.upper_bound is None or row.upper_bound > cutoff:
+            continue
+        # The table stays in place for archiving; it just stops being queried
+        await conn.exec_driver_sql(f'ALTER TABLE {PARENT_TABLE} DETACH PARTITION "{row.name}"')
+        # ...and counted. Detached and locked until commit, so no write lands in between
+        if has_counters:
+            await conn.execute(text(f"""
+                UPDATE usuario_contadores c
+                SET total = c.total - d.filas
+                FROM (SELECT usuario_id, count(*) AS filas FROM "{row.name}" GROUP BY usuario_id) d
+                WHERE c.usuario_id = d.usuario_id AND c.entidad = 'actividades'
+            """))
+        detached.append(row.name)
+    return detached
+
+
+async def maintain_actividades_partitions(async_engine, now: Optional[datetime] = None) -> dict:
+    """Create current and upcoming partitions, drain the default one and detach expired ones"""
+    now = now or datetime.now(timezone.utc)
+    result = {"created": [], "detached": []}
+    
+    async with async_engine.begin() as conn:
+        if not (await conn.execute(IS_PARTITIONED_QUERY)).scalar():
+            return result
+        
+        locked = (await conn.execute(text("SELECT pg_try_advisory_xact_lock(:id)"), {"id": PARTITION_LOCK_ID})).scalar()
+        if not locked:
+            return result
+        
+        result["created"] = await _ensure_partitions(conn, now)
+        result["detached"] = await _detach_old_partitions(conn, now)
+    
+    if result["created"]:
+        logger.info(f"🗂️ Created actividades partitions: {', '.join(result['created'])}")
+    if result["detached"]:
+        logger.info(f"🗄️ Detached actividades partitions: {', '.join(result['detached'])}")
+    return result
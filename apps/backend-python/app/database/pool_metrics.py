@@ -0,0 +1,91 @@
+"""
+Connection pool instrumentation - checkout latency and live pool counters
+"""
+
+import time
+from bisect import bisect_left
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Upper bounds (ms) of the acquire latency histogram buckets
+ACQUIRE_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class AcquireHistogram:
+    """Histogram of the time spent waiting for a pooled connection"""
+    
+    def __init__(self, buckets=ACQUIRE_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.reset()
+    
+    def reset(self):
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.timeouts = 0
+    
+    def observe(self, elapsed_ms: float):
+        self.counts[bisect_left(self.buckets, elapsed_ms)] += 1
+        self.count += 1
+        self.total_ms += elapsed_ms
+        if elapsed_ms > self.max_ms:
+            self.max_ms = elapsed_ms
+    
+    def snapshot(self) -> dict:
+        """Cumulative (Prometheus-style) view of the histogram"""
+        cumulative = {}
+        running = 0
+        for bound, bucket_count in zip(self.buckets, self.counts):
+            running += bucket_count
+            cumulative[f"le_{bound}ms"] = running
+        cumulative["le_inf"] = self.count
+        
+        return {
+            "count": self.count,
+            "sum_ms": round(self.total_ms, 3),
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0,
+            "max_ms": round(self.max_ms, 3),
+            "timeouts": self.timeouts,
+            "buckets": cumulative
+        }
+
+
+# Process-wide histogram shared by every instrumented pool
+acquire_histogram = AcquireHistogram()
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records how long each checkout waits"""
+    
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            acquire_histogram.timeouts += 1
+            raise
+        finally:
+            acquire_histogram.observe((time.perf_counter() - start) * 1000)
+
+
+def get_pool_stats(engine) -> dict:
+    """Live counters for the engine's pool plus the acquire latency histogram"""
+    if engine is None:
+        return {"status": "disconnected"}
+    
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return {"status": "unpooled", "pool_class": type(pool).__name__}
+    
+    return {
+        "pool_class": type(pool).__name__,
+        "pool_size": pool.size(),
+        "max_overflow": pool._max_overflow,
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        "timeout_seconds": pool.timeout(),
+        "acquire_latency": acquire_histogram.snapshot()
+    }
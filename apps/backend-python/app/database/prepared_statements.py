@@ -0,0 +1,91 @@
+"""
+Registry of named server-side prepared statements for the hot raw SQL queries
+"""
+
+import time
+from typing import Dict
+
+from sqlalchemy import event, text
+from sqlalchemy.sql.elements import TextClause
+from loguru import logger
+
+
+class PreparedStatementRegistry:
+    """Named text() statements prepared on every pooled asyncpg connection
+
+    SQLAlchemy's asyncpg adapter keeps a per-connection LRU of prepared
+    statements keyed by the rendered SQL. Registering a query here keeps its
+    SQL text stable across calls, and warming prepares it under a readable
+    server-side name (``cdc_<name>``) as soon as a connection is opened, so
+    requests reuse the parsed statement and plan instead of re-preparing it.
+    """
+    
+    def __init__(self, prefix: str = "cdc_"):
+        self.prefix = prefix
+        self._statements: Dict[str, TextClause] = {}
+        self.warmed_connections = 0
+    
+    def register(self, name: str, sql: str) -> TextClause:
+        """Register a raw SQL query under a unique name"""
+        if name in self._statements:
+            raise ValueError(f"Prepared statement '{name}' already registered")
+        
+        statement = text(sql)
+        self._statements[name] = statement
+        return statement
+    
+    def __getitem__(self, name: str) -> TextClause:
+        return self._statements[name]
+    
+    def __len__(self) -> int:
+        return len(self._statements)
+    
+    def names(self) -> list:
+        return list(self._statements)
+    
+    def attach(self, async_engine):
+        """Prepare every registered statement on each new pooled connection"""
+        dialect = async_engine.dialect
+        
+        @event.listens_for(async_engine.sync_engine, "connect")
+        def _prepare_on_connect(dbapi_connection, connection_record):
+            dbapi_connection.await_(self._prepare_all(dbapi_connection, dialect))
+    
+    async def warm(self, async_engine) -> int:
+        """Make sure a pooled connection holds every statement (startup hook)"""
+        async with async_engine.connect() as conn:
+            raw = await conn.get_raw_connection()
+            return await self._prepare_all(raw.dbapi_connection, async_engine.dialect)
+    
+    async def _prepare_all(self, dbapi_connection, dialect) -> int:
+        # Populates the adapter's own statement cache so that SQLAlchemy's
+        # execution path finds the statement by its rendered SQL
+        cache = getattr(dbapi_connection, "_prepared_statement_cache", None)
+        if cache is None:
+            return 0
+        
+        asyncpg_connection = dbapi_connection._connection
+        prepared = 0
+        
+        for name, statement in self._statements.items():
+            sql = str(statement.compile(dialect=dialect))
+            if sql in cache:
+                continue
+            
+            try:
+                prepared_stmt = await asyncpg_connection.prepare(sql, name=f"{self.prefix}{name}")
+            except Exception as e:
+                logger.warning(f"Could not prepare statement {name}: {e}")
+                continue
+            
+            cache[sql] = (prepared_stmt, prepared_stmt.get_attributes(), time.time())
+            prepared += 1
+        
+        if prepared:
+            self.warmed_connections += 1
+        
+        return prepared
+
+
+# Global registry, populated at import time by the route modules
+prepared_statements = PreparedStatementRegistry()
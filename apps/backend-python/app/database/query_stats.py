@@ -0,0 +1,89 @@
+"""
+Per-request SQL statement counting and N+1 detection via engine events
+"""
+
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+
+
+class RequestQueryStats:
+    """Statements and DB time accumulated while serving one request"""
+    
+    __slots__ = ("count", "total_seconds", "statements")
+    
+    def __init__(self):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.statements = Counter()
+    
+    def record(self, statement: str, elapsed: float):
+        self.count += 1
+        self.total_seconds += elapsed
+        self.statements[statement] += 1
+    
+    def repeated(self, threshold: int) -> List[tuple]:
+        """Statements executed at least ``threshold`` times (likely N+1 loops)"""
+        return [(sql, n) for sql, n in self.statements.most_common() if n >= threshold]
+
+
+class RouteQuerySummary:
+    """Worst-case statement counts per route, for benchmarks and /health/metrics"""
+    
+    def __init__(self):
+        self.routes: Dict[str, dict] = {}
+    
+    def observe(self, route: str, stats: RequestQueryStats, flagged: bool):
+        summary = self.routes.setdefault(route, {
+            "requests": 0,
+            "max_queries": 0,
+            "total_queries": 0,
+            "max_db_time_ms": 0.0,
+            "flagged": 0
+        })
+        summary["requests"] += 1
+        summary["total_queries"] += stats.count
+        summary["max_queries"] = max(summary["max_queries"], stats.count)
+        summary["max_db_time_ms"] = max(summary["max_db_time_ms"], round(stats.total_seconds * 1000, 3))
+        if flagged:
+            summary["flagged"] += 1
+    
+    def snapshot(self) -> dict:
+        return {route: dict(summary) for route, summary in self.routes.items()}
+
+
+current_query_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar("current_query_stats", default=None)
+route_query_summary = RouteQuerySummary()
+
+
+def start_query_stats():
+    """Begin counting for the current request; returns (stats, reset token)"""
+    stats = RequestQueryStats()
+    return stats, current_query_stats.set(stats)
+
+
+def stop_query_stats(token):
+    current_query_stats.reset(token)
+
+
+def instrument_engine(async_engine):
+    """Attach statement timing hooks to an async engine"""
+    sync_engine = async_engine.sync_engine
+    
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._query_start = time.perf_counter()
+    
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = current_query_stats.get()
+        if stats is None or context is None:
+            return
+        
+        start = getattr(context, "_query_start", None)
+        elapsed = time.perf_counter() - start if start is not None else 0.0
+        stats.record(statement, elapsed)
@@ -0,0 +1,228 @@
+"""
+Read replica routing - lag-aware, with read-your-writes per user
+
+A write is detected when a primary transaction that executed INSERT, UPDATE,
+DELETE or MERGE commits, whether it came from an ORM flush or Core SQL. Reads
+are then pinned to the primary for DATABASE_READ_YOUR_WRITES_SECONDS in two
+ways:
+
+* per user, in this process (covers the user's other devices on this worker)
+* per client, across workers: the response carries the deadline in the
+  ``rw_until`` cookie and the X-Read-Your-Writes-Until header, which the
+  client sends back (see app/middleware/read_your_writes.py)
+"""
+
+import asyncio
+import re
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+from loguru import logger
+
+# Seconds of replay lag; 0 when the replica has replayed everything it received
+# (an idle primary would otherwise look like a growing lag)
+REPLICA_LAG_QUERY = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END AS lag_seconds
+""")
+
+
+WRITE_STATEMENT = re.compile(r"\b(INSERT\s+INTO|UPDATE\s+\S+\s+SET|DELETE\s+FROM|MERGE\s+INTO)\b", re.IGNORECASE)
+
+
+class WriteWindow:
+    """Read-your-writes deadlines (epoch seconds) of the client making the current request"""
+    
+    __slots__ = ("carried_until", "wrote_until")
+    
+    def __init__(self, carried_until: float = 0.0):
+        self.carried_until = carried_until
+        self.wrote_until = 0.0
+    
+    def pinned(self) -> bool:
+        return max(self.carried_until, self.wrote_until) > time.time()
+
+
+current_write_window: ContextVar[Optional[WriteWindow]] = ContextVar("current_write_window", default=None)
+
+
+class ReplicaRouter:
+    """Decide per request whether a read can be served by the replica"""
+    
+    def __init__(self):
+        self.engine = None
+        self.session_factory = None
+        self.max_lag_seconds = 5.0
+        self.lag_check_interval = 2.0
+        self.read_your_writes_seconds = 10.0
+        
+        self._lag_seconds: Optional[float] = None
+        self._lag_checked_at = 0.0
+        self._lag_lock = asyncio.Lock()
+        self._recent_writers: Dict[str, float] = {}
+        
+        self.stats = {
+            "replica_reads": 0,
+            "primary_reads_lag": 0,
+            "primary_reads_recent_write": 0
+        }
+    
+    @property
+    def enabled(self) -> bool:
+        return self.session_factory is not None
+    
+    def configure(self, engine, session_factory, max_lag_seconds: float,
+                  lag_check_interval: float, read_your_writes_seconds: float):
+        self.engine = engine
+        self.session_factory = session_factory
+        self.max_lag_seconds = max_lag_seconds
+        self.lag_check_interval = lag_check_interval
+        self.read_your_writes_seconds = read_your_writes_seconds
+        
+        if not event.contains(Session, "after_flush", _collect_written_users):
+            event.listen(Session, "after_flush", _collect_written_users)
+            event.listen(Session, "after_commit", _mark_written_users)
+            event.listen(Session, "after_soft_rollback", _discard_written_users)
+    
+    def reset(self):
+        self.engine = None
+        self.session_factory = None
+        self._lag_seconds = None
+        self._lag_checked_at = 0.0
+        self._recent_writers.clear()
+    
+    def mark_write(self, user_id: str):
+        """Pin ``user_id``'s reads to the primary for the read-your-writes window"""
+        self._recent_writers[user_id] = time.monotonic() + self.read_your_writes_seconds
+    
+    def start_write_window(self, carried: Optional[str]):
+        """Track the current request's client; ``carried`` is the deadline it sent back"""
+        try:
+            # Capped, so a client cannot pin itself to the primary for longer
+            carried_until = min(float(carried), time.time() + self.read_your_writes_seconds) if carried else 0.0
+        except ValueError:
+            carried_until = 0.0
+        window = WriteWindow(carried_until)
+        return window, current_write_window.set(window)
+    
+    def stop_write_window(self, token):
+        current_write_window.reset(token)
+    
+    def _mark_client_write(self):
+        window = current_write_window.get()
+        if window is not None:
+            window.wrote_until = time.time() + self.read_your_writes_seconds
+    
+    def track_writes(self, async_engine):
+        """Detect committed writes on the primary engine, including Core SQL"""
+        sync_engine = async_engine.sync_engine
+        if event.contains(sync_engine, "commit", _commit_tracked_writes):
+            return
+        event.listen(sync_engine, "before_cursor_execute", _note_write_statement)
+        event.listen(sync_engine, "commit", _commit_tracked_writes)
+        event.listen(sync_engine, "rollback", _discard_tracked_writes)
+    
+    def wrote_recently(self, user_id: str) -> bool:
+        deadline = self._recent_writers.get(user_id)
+        if deadline is None:
+            return False
+        if deadline < time.monotonic():
+            del self._recent_writers[user_id]
+            return False
+        return True
+    
+    async def replica_lag(self) -> Optional[float]:
+        """Replication lag in seconds, cached for ``lag_check_interval``; None if unknown"""
+        if time.monotonic() - self._lag_checked_at < self.lag_check_interval:
+            return self._lag_seconds
+        
+        async with self._lag_lock:
+            # Another request may have refreshed it while we waited
+            if time.monotonic() - self._lag_checked_at < self.lag_check_interval:
+                return self._lag_seconds
+            
+            try:
+                async with self.engine.connect() as conn:
+                    lag = (await conn.execute(REPLICA_LAG_QUERY)).scalar()
+                self._lag_seconds = float(lag) if lag is not None else None
+            except Exception as e:
+                logger.warning(f"Replica lag check failed: {e}")
+                self._lag_seconds = None
+            
+            self._lag_checked_at = time.monotonic()
+            return self._lag_seconds
+    
+    async def session_factory_for(self, user_id: Optional[str]):
+        """Replica session factory when it is safe to read from it, else None"""
+        if not self.enabled:
+            return None
+        
+        window = current_write_window.get()
+        if (window is not None and window.pinned()) or (user_id and self.wrote_recently(user_id)):
+            self.stats["primary_reads_recent_write"] += 1
+            return None
+        
+        lag = await self.replica_lag()
+        if lag is None or lag > self.max_lag_seconds:
+            self.stats["primary_reads_lag"] += 1
+            return None
+        
+        self.stats["replica_reads"] += 1
+        return self.session_factory
+    
+    def info(self) -> dict:
+        if not self.enabled:
+            return {"enabled": False}
+        
+        return {
+            "enabled": True,
+            "lag_seconds": self._lag_seconds,
+            "max_lag_seconds": self.max_lag_seconds,
+            "users_pinned_to_primary": len(self._recent_writers),
+            **self.stats
+        }
+
+
+replica_router = ReplicaRouter()
+
+
+def _owner_id(instance) -> Optional[str]:
+    # Parcela rows are owned through propietario_id, Actividad rows through usuario_id
+    return getattr(instance, "propietario_id", None) or getattr(instance, "usuario_id", None)
+
+
+def _collect_written_users(session, flush_context):
+    written = session.info.setdefault("written_users", set())
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        owner = _owner_id(instance)
+        if owner:
+            written.add(owner)
+
+
+def _mark_written_users(session):
+    for user_id in session.info.pop("written_users", ()):
+        replica_router.mark_write(user_id)
+
+
+def _discard_written_users(session, previous_transaction):
+    session.info.pop("written_users", None)
+
+
+def _note_write_statement(conn, cursor, statement, parameters, context, executemany):
+    if WRITE_STATEMENT.search(statement):
+        conn.info["wrote"] = True
+
+
+def _commit_tracked_writes(conn):
+    if conn.info.pop("wrote", False):
+        replica_router._mark_client_write()
+
+
+def _discard_tracked_writes(conn):
+    conn.info.pop("wrote", None)
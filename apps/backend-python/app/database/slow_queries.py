@@ -0,0 +1,191 @@
+"""
+Slow query capture - bounded ring buffer with EXPLAIN (ANALYZE, BUFFERS) plans
+"""
+
+import asyncio
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import event
+from loguru import logger
+
+from app.database.query_stats import current_query_stats
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_BIND_PARAM = re.compile(r"\$\d+|%\(\w+\)s|(?<!:):\w+")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+_DML = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE)\b", re.IGNORECASE)
+
+
+def normalize_sql(statement: str) -> str:
+    """Replace literals and bind params with ``?`` so equal queries share a fingerprint"""
+    normalized = _STRING_LITERAL.sub("?", statement)
+    normalized = _BIND_PARAM.sub("?", normalized)
+    normalized = _NUMBER.sub("?", normalized)
+    normalized = _IN_LIST.sub("(?, ...)", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+
+def fingerprint_sql(normalized: str) -> str:
+    return hashlib.sha1(normalized.encode()).hexdigest()[:16]
+
+
+def parameter_shapes(parameters) -> list:
+    """Types (never values) of the bound parameters"""
+    if isinstance(parameters, dict):
+        parameters = parameters.values()
+    
+    shapes = []
+    for value in parameters or ():
+        if isinstance(value, (list, tuple)):
+            shapes.append(f"{type(value).__name__}[{len(value)}]")
+        else:
+            shapes.append(type(value).__name__)
+    return shapes
+
+
+def _seq_scans(plan_node: dict) -> list:
+    """Relations read with a sequential scan anywhere in the plan tree"""
+    relations = []
+    if plan_node.get("Node Type") == "Seq Scan":
+        relations.append(plan_node.get("Relation Name"))
+    for child in plan_node.get("Plans", ()):
+        relations.extend(_seq_scans(child))
+    return relations
+
+
+class SlowQueryLog:
+    """Slow statements deduplicated by fingerprint, oldest evicted first"""
+    
+    def __init__(self, capacity: int = 100):
+        self.capacity = capacity
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+    
+    def record(self, statement: str, parameters, elapsed_ms: float) -> Optional[dict]:
+        """Store a slow execution; returns the entry when it is a new fingerprint"""
+        normalized = normalize_sql(statement)
+        fingerprint = fingerprint_sql(normalized)
+        now = datetime.utcnow().isoformat()
+        
+        entry = self._entries.get(fingerprint)
+        if entry is not None:
+            entry["calls"] += 1
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+            entry["last_seen"] = now
+            self._entries.move_to_end(fingerprint)
+            return None
+        
+        entry = {
+            "fingerprint": fingerprint,
+            "sql": normalized,
+            "param_shapes": parameter_shapes(parameters),
+            "calls": 1,
+            "total_ms": elapsed_ms,
+            "max_ms": elapsed_ms,
+            "first_seen": now,
+            "last_seen": now,
+            "plan_status": "pending",
+            "plan": None,
+            "seq_scans": []
+        }
+        self._entries[fingerprint] = entry
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+        return entry
+    
+    def set_plan(self, fingerprint: str, plan: Optional[dict] = None, status: str = "captured"):
+        entry = self._entries.get(fingerprint)
+        if entry is None:
+            return
+        entry["plan_status"] = status
+        entry["plan"] = plan
+        if plan:
+            entry["seq_scans"] = _seq_scans(plan.get("Plan", {}))
+    
+    def entries(self) -> list:
+        """Most recently seen first"""
+        return [
+            {**entry, "total_ms": round(entry["total_ms"], 3), "max_ms": round(entry["max_ms"], 3)}
+            for entry in reversed(self._entries.values())
+        ]
+    
+    def clear(self):
+        self._entries.clear()
+
+
+slow_query_log = SlowQueryLog()
+_explain_tasks = set()
+
+
+async def _explain(async_engine, fingerprint: str, statement: str, parameters, timeout_ms: int):
+    """EXPLAIN (ANALYZE, BUFFERS) the statement on a separate connection, rolled back"""
+    # Runs outside the request that triggered it
+    current_query_stats.set(None)
+    
+    try:
+        async with async_engine.connect() as conn:
+            await conn.execution_options(skip_slow_query_log=True)
+            trans = await conn.begin()
+            try:
+                await conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
+                result = await conn.exec_driver_sql(
+                    f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}",
+                    tuple(parameters) if parameters else ()
+                )
+                plan = result.scalar()
+            finally:
+                await trans.rollback()
+        
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        slow_query_log.set_plan(fingerprint, plan[0] if isinstance(plan, list) else plan)
+    
+    except Exception as e:
+        logger.warning(f"EXPLAIN failed for slow query {fingerprint}: {e}")
+        slow_query_log.set_plan(fingerprint, {"error": str(e)}, status="failed")
+
+
+def instrument_engine(async_engine, threshold_ms: float, explain: bool = True, explain_timeout_ms: int = 10000):
+    """Capture statements slower than ``threshold_ms`` executed by ``async_engine``"""
+    sync_engine = async_engine.sync_engine
+    
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._slow_query_start = time.perf_counter()
+    
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, "_slow_query_start", None)
+        if start is None:
+            return
+        
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if elapsed_ms < threshold_ms or conn.get_execution_options().get("skip_slow_query_log"):
+            return
+        
+        entry = slow_query_log.record(statement, parameters, elapsed_ms)
+        if entry is None:
+            return
+        
+        logger.warning(f"🐢 Slow query ({elapsed_ms:.0f} ms) [{entry['fingerprint']}]: {entry['sql'][:200]}")
+        
+        # EXPLAIN ANALYZE executes the statement again, so only read-only ones
+        is_read = statement.lstrip().upper().startswith(("SELECT", "WITH")) and not _DML.search(statement)
+        if not explain or executemany or not is_read:
+            slow_query_log.set_plan(entry["fingerprint"], status="skipped")
+            return
+        
+        task = asyncio.get_running_loop().create_task(
+            _explain(async_engine, entry["fingerprint"], statement, parameters, explain_timeout_ms)
+        )
+        _explain_tasks.add(task)
+        task.add_done_callback(_explain_tasks.discard)
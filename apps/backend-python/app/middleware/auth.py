@@ -162,6 +162,20 @@ async def require_auth(current_user: dict = Depends(get_current_user)) -> dict:
     return current_user
 
 
+async def require_admin(current_user: dict = Depends(get_current_user)) -> dict:
+    """Require a user listed in ADMIN_USER_IDS"""
+    if current_user["id"] not in settings.parse_admin_user_ids(settings.ADMIN_USER_IDS):
+        raise HTTPException(
+            status_code=403,
+            detail={
+                "success": False,
+                "error": "Forbidden",
+                "message": "Admin access required"
+            }
+        )
+    return current_user
+
+
 class ClerkAuth:
     """Clerk authentication helper class"""
     
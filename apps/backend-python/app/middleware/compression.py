@@ -0,0 +1,276 @@
+"""
+Compression middleware - negotiated brotli/gzip for API responses
+
+Buffered bodies over COMPRESSION_MIN_BYTES are compressed whole, off the
+event loop when larger than COMPRESSION_THREADPOOL_MIN_BYTES. Streaming
+responses (e.g. /parcelas/map-data/geojson) are compressed chunk by chunk
+and flushed after each chunk, so clients still receive them progressively.
+
+Compressed bodies of responses under COMPRESSION_CACHE_PATHS (tiles, map
+data, catalogs) are cached by a digest of the uncompressed bytes, so the same
+body is only compressed once per worker and never needs invalidating.
+"""
+
+import gzip
+import hashlib
+import time
+import zlib
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from loguru import logger
+
+from app.config.settings import settings
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+    logger.warning("brotli not available. Responses will only be compressed with gzip.")
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/geo+json",
+    "application/javascript",
+    "application/xml",
+    "application/x-protobuf",
+    "application/vnd.mapbox-vector-tile",
+)
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """"br" or "gzip", whichever the client ranks higher (brotli on ties), or None"""
+    qualities = {}
+    for item in accept_encoding.split(","):
+        name, *params = item.split(";")
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.strip().lower()] = quality
+    
+    wildcard = qualities.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for encoding in ("br", "gzip") if BROTLI_AVAILABLE else ("gzip",):
+        quality = qualities.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Whole-body compression at the configured level"""
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    # mtime=0 keeps the output identical for identical bodies
+    return gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+class StreamCompressor:
+    """Incremental compressor that flushes after every chunk"""
+    
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+            self._process = self._compressor.process
+            self._flush = self._compressor.flush
+            self._finish = self._compressor.finish
+        else:
+            self._compressor = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._process = self._compressor.compress
+            self._flush = lambda: self._compressor.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = self._compressor.flush
+    
+    def compress(self, chunk: bytes) -> bytes:
+        return self._process(chunk) + self._flush()
+    
+    def finish(self, chunk: bytes = b"") -> bytes:
+        return self._process(chunk) + self._finish()
+
+
+def _digest(body: bytes) -> bytes:
+    return hashlib.blake2b(body, digest_size=16).digest()
+
+
+class CompressionCache:
+    """LRU of compressed bodies keyed by encoding and body digest, bounded by size and a TTL
+
+    Keys are derived from the uncompressed bytes, so a hit is always the
+    compression of exactly the body being sent: a changed tile or map-data
+    response simply misses. The TTL only keeps unused entries from lingering.
+    """
+    
+    def __init__(self, max_bytes: int, ttl_seconds: float):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.size_bytes = 0
+        self._bodies: "OrderedDict[Tuple[str, bytes], Tuple[float, bytes]]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0}
+    
+    def get(self, key: Tuple[str, bytes]) -> Optional[bytes]:
+        entry = self._bodies.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                self._remove(key)
+            self.stats["misses"] += 1
+            return None
+        
+        self._bodies.move_to_end(key)
+        self.stats["hits"] += 1
+        return entry[1]
+    
+    def put(self, key: Tuple[str, bytes], body: bytes):
+        if len(body) > self.max_bytes:
+            return
+        
+        self._remove(key)
+        self._bodies[key] = (time.monotonic() + self.ttl_seconds, body)
+        self.size_bytes += len(body)
+        
+        while self.size_bytes > self.max_bytes:
+            self._remove(next(iter(self._bodies)))
+    
+    def clear(self):
+        self._bodies.clear()
+        self.size_bytes = 0
+    
+    def _remove(self, key: Tuple[str, bytes]):
+        entry = self._bodies.pop(key, None)
+        if entry is not None:
+            self.size_bytes -= len(entry[1])
+    
+    def info(self) -> dict:
+        return {
+            "enabled": settings.COMPRESSION_ENABLED,
+            "brotli": BROTLI_AVAILABLE,
+            "entries": len(self._bodies),
+            "size_bytes": self.size_bytes,
+            "max_bytes": self.max_bytes,
+            **self.stats
+        }
+
+
+compression_cache = CompressionCache(
+    max_bytes=settings.COMPRESSION_CACHE_MAX_MB * 1024 * 1024,
+    ttl_seconds=settings.COMPRESSION_CACHE_TTL_SECONDS
+)
+
+
+async def _offload(fn, data: bytes, *args):
+    """Run CPU-bound ``fn`` in the threadpool when ``data`` is large"""
+    if len(data) >= settings.COMPRESSION_THREADPOOL_MIN_BYTES:
+        return await run_in_threadpool(fn, data, *args)
+    return fn(data, *args)
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware, so streaming responses are not buffered"""
+    
+    def __init__(self, app):
+        self.app = app
+        self.cache_paths = tuple(settings.parse_compression_cache_paths(settings.COMPRESSION_CACHE_PATHS))
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.COMPRESSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        
+        # Wrapped even when no encoding is accepted: compressible responses still need Vary
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        cacheable = scope["path"].startswith(self.cache_paths) if self.cache_paths else False
+        await _CompressedResponse(encoding, cacheable, send).run(self.app, scope, receive)
+
+
+class _CompressedResponse:
+    """Per-request state: holds back the start message until the first body chunk"""
+    
+    def __init__(self, encoding: Optional[str], cacheable: bool, send):
+        self.encoding = encoding
+        self.cacheable = cacheable
+        self.send = send
+        self.start_message = None
+        self.passthrough = False
+        self.stream: Optional[StreamCompressor] = None
+    
+    async def run(self, app, scope, receive):
+        await app(scope, receive, self.on_message)
+    
+    async def on_message(self, message):
+        if message["type"] == "http.response.start":
+            headers = MutableHeaders(raw=message["headers"])
+            eligible = not (
+                message["status"] < 200 or message["status"] in (204, 304)
+                or "content-encoding" in headers
+                or not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+            )
+            # Whether or not this one ends up compressed, the representation
+            # depends on Accept-Encoding, so shared caches must key on it
+            if eligible:
+                headers.add_vary_header("Accept-Encoding")
+            self.passthrough = not eligible or self.encoding is None
+            if self.passthrough:
+                await self.send(message)
+            else:
+                self.start_message = message
+            return
+        
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+        
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        
+        if self.stream is not None:
+            if more_body:
+                chunk = await _offload(self.stream.compress, body)
+            else:
+                chunk = await _offload(self.stream.finish, body)
+            await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+            return
+        
+        if more_body:
+            # Streaming response: length unknown, compress incrementally
+            self.stream = StreamCompressor(self.encoding)
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            del headers["content-length"]
+            self._mark_encoded(headers)
+            await self.send(self.start_message)
+            await self.send({
+                "type": "http.response.body",
+                "body": await _offload(self.stream.compress, body),
+                "more_body": True
+            })
+            return
+        
+        compressed = await self._compress_body(body) if len(body) >= settings.COMPRESSION_MIN_BYTES else None
+        if compressed is not None and len(compressed) < len(body):
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            headers["content-length"] = str(len(compressed))
+            self._mark_encoded(headers)
+            body = compressed
+        
+        await self.send(self.start_message)
+        await self.send({"type": "http.response.body", "body": body})
+    
+    async def _compress_body(self, body: bytes) -> bytes:
+        if not self.cacheable:
+            return await _offload(compress, body, self.encoding)
+        
+        key = (self.encoding, await _offload(_digest, body))
+        compressed = compression_cache.get(key)
+        if compressed is None:
+            compressed = await _offload(compress, body, self.encoding)
+            compression_cache.put(key, compressed)
+        return compressed
+    
+    def _mark_encoded(self, headers: MutableHeaders):
+        headers["content-encoding"] = self.encoding
\ No newline at end of file
@@ -7,14 +7,63 @@ from fastapi import Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
 from loguru import logger
 
+from app.config.settings import settings
+from app.database.query_stats import start_query_stats, stop_query_stats, route_query_summary
+
+
+def _route_path(request: Request) -> str:
+    """Route template (e.g. /api/v1/parcelas/{parcela_id}) instead of the raw path"""
+    route = request.scope.get("route")
+    return getattr(route, "path", request.url.path)
+
+
+def _check_query_stats(request: Request, route_path: str, query_stats) -> bool:
+    """Warn about requests over the statement budget or repeating a statement"""
+    flagged = False
+    
+    if query_stats.count > settings.DB_QUERY_COUNT_THRESHOLD:
+        flagged = True
+        logger.warning(
+            f"⚠️ {request.method} {route_path} issued {query_stats.count} SQL statements "
+            f"(threshold {settings.DB_QUERY_COUNT_THRESHOLD})"
+        )
+    
+    for statement, times in query_stats.repeated(settings.DB_QUERY_REPEAT_THRESHOLD):
+        flagged = True
+        logger.warning(
+            f"⚠️ Possible N+1 in {request.method} {route_path}: statement executed {times} times: "
+            f"{' '.join(statement.split())[:200]}"
+        )
+    
+    return flagged
+
+
+async def _on_body_sent(body_iterator, callback):
+    """Pass the body through, then call ``callback`` once it has been sent (or abandoned)"""
+    try:
+        async for chunk in body_iterator:
+            yield chunk
+    finally:
+        callback()
+
 
 class LoggingMiddleware(BaseHTTPMiddleware):
-    """Middleware for logging requests and responses"""
+    """Middleware for logging requests and responses
+
+    The response line and route_query_summary are recorded once the body has
+    been sent, so statements a StreamingResponse issues while streaming
+    (e.g. /parcelas/map-data/geojson) are counted. The X-Process-Time and
+    X-DB-* headers go out before the body and only cover the work done until
+    the response started.
+    """
     
     async def dispatch(self, request: Request, call_next):
         # Start timer
         start_time = time.time()
         
+        # Count SQL statements issued while serving this request
+        query_stats, stats_token = start_query_stats()
+        
         # Get client info
         client_ip = request.client.host if request.client else "unknown"
         user_agent = request.headers.get("user-agent", "unknown")
@@ -39,21 +88,39 @@ class LoggingMiddleware(BaseHTTPMiddleware):
             # Calculate processing time
             process_time = time.time() - start_time
             
-            # Log response
-            logger.info(
-                f"{request.method} {request.url.path} - {response.status_code}",
-                extra={
-                    "method": request.method,
-                    "path": request.url.path,
-                    "status_code": response.status_code,
-                    "process_time": process_time,
-                    "client_ip": client_ip
-                }
-            )
+            route_path = _route_path(request)
+            
+            def log_response():
+                # query_stats keeps counting in the app's context while the body streams
+                if settings.DB_QUERY_STATS_ENABLED:
+                    flagged = _check_query_stats(request, route_path, query_stats)
+                    route_query_summary.observe(f"{request.method} {route_path}", query_stats, flagged)
+                
+                # Log response
+                logger.info(
+                    f"{request.method} {request.url.path} - {response.status_code} "
+                    f"({query_stats.count} queries, {query_stats.total_seconds * 1000:.1f} ms DB)",
+                    extra={
+                        "method": request.method,
+                        "path": request.url.path,
+                        "route": route_path,
+                        "status_code": response.status_code,
+                        "process_time": time.time() - start_time,
+                        "db_queries": query_stats.count,
+                        "db_time": query_stats.total_seconds,
+                        "client_ip": client_ip
+                    }
+                )
+            
+            response.body_iterator = _on_body_sent(response.body_iterator, log_response)
             
             # Add timing header
             response.headers["X-Process-Time"] = str(process_time)
             
+            if settings.DEBUG:
+                response.headers["X-DB-Queries"] = str(query_stats.count)
+                response.headers["X-DB-Time"] = str(query_stats.total_seconds)
+            
             return response
             
         except Exception as e:
@@ -68,8 +135,13 @@ class LoggingMiddleware(BaseHTTPMiddleware):
                     "path": request.url.path,
                     "error": str(e),
                     "process_time": process_time,
+                    "db_queries": query_stats.count,
+                    "db_time": query_stats.total_seconds,
                     "client_ip": client_ip
                 }
             )
             
-            raise
\ No newline at end of file
+            raise
+        
+        finally:
+            stop_query_stats(stats_token)
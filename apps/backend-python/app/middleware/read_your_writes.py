@@ -0,0 +1,42 @@
+"""
+Read-your-writes middleware - carries the primary-pin deadline across workers
+"""
+
+import math
+
+from fastapi import Request
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.database.replica import replica_router
+
+READ_YOUR_WRITES_COOKIE = "rw_until"
+READ_YOUR_WRITES_HEADER = "X-Read-Your-Writes-Until"
+
+
+class ReadYourWritesMiddleware(BaseHTTPMiddleware):
+    """Pin a client's reads to the primary after it writes, whichever worker serves it
+
+    The deadline (epoch seconds) is returned as a cookie for clients with a
+    cookie jar and as a header for clients that echo it back themselves.
+    """
+    
+    async def dispatch(self, request: Request, call_next):
+        if not replica_router.enabled:
+            return await call_next(request)
+        
+        carried = request.headers.get(READ_YOUR_WRITES_HEADER) or request.cookies.get(READ_YOUR_WRITES_COOKIE)
+        window, token = replica_router.start_write_window(carried)
+        try:
+            response = await call_next(request)
+        finally:
+            replica_router.stop_write_window(token)
+        
+        if window.wrote_until:
+            deadline = f"{window.wrote_until:.3f}"
+            response.headers[READ_YOUR_WRITES_HEADER] = deadline
+            response.set_cookie(
+                READ_YOUR_WRITES_COOKIE, deadline,
+                max_age=math.ceil(replica_router.read_your_writes_seconds),
+                httponly=True, samesite="lax"
+            )
+        return response
\ No newline at end of file
@@ -2,8 +2,8 @@
 Actividad model - Equivalent to Node.js Actividad model
 """
 
-from sqlalchemy import Column, String, Float, DateTime, Enum, Text, JSON, ForeignKey
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Float, DateTime, Enum, Text, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.sql import func
 from geoalchemy2 import Geometry
 import uuid
@@ -52,7 +52,7 @@ class Actividad(Base):
     organizacion_id = Column(String(255), nullable=True)
     
     # Timing
-    fecha = Column(DateTime(timezone=True), nullable=False)
+    fecha = Column(DateTime(timezone=True), nullable=False)  # partition key (migrations/0002)
     duracion_horas = Column(Float, nullable=True)
     estado = Column(Enum(EstadoActividad), default=EstadoActividad.PLANIFICADA)
     
@@ -61,8 +61,8 @@ class Actividad(Base):
     superficie_afectada = Column(Float, nullable=True)  # hectáreas
     
     # Products and materials
-    productos = Column(JSON, nullable=True)  # Lista de productos utilizados
-    maquinaria = Column(JSON, nullable=True)  # Maquinaria utilizada
+    productos = Column(JSONB, nullable=True)  # Lista de productos utilizados
+    maquinaria = Column(JSONB, nullable=True)  # Maquinaria utilizada
     
     # Economic data
     costo_mano_obra = Column(Float, nullable=True)
@@ -71,15 +71,15 @@ class Actividad(Base):
     costo_total = Column(Float, nullable=True)
     
     # Weather conditions
-    condiciones_meteorologicas = Column(JSON, nullable=True)
+    condiciones_meteorologicas = Column(JSONB, nullable=True)
     
     # OCR and documents
-    documentos_ocr = Column(JSON, nullable=True)  # Resultados OCR de productos
-    imagenes = Column(JSON, nullable=True)  # URLs de imágenes
+    documentos_ocr = Column(JSONB, nullable=True)  # Resultados OCR de productos
+    imagenes = Column(JSONB, nullable=True)  # URLs de imágenes
     
     # Additional data
     notas = Column(Text, nullable=True)
-    configuracion = Column(JSON, nullable=True)
+    configuracion = Column(JSONB, nullable=True)
     
     # Metadata
     created_at = Column(DateTime(timezone=True), server_default=func.now())
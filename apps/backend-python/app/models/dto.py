@@ -0,0 +1,265 @@
+"""
+Read-only DTOs - column projections for list and sync endpoints
+
+Rows are selected as Core tuples (no identity map or change tracking) and
+unpacked into ``__slots__`` objects whose ``to_dict()`` returns the same keys
+as the model's. Geometries come back as GeoJSON objects built by PostGIS.
+
+The hot paths skip the objects: each DTO also has a ``serialize`` function,
+generated from its column list, that maps a row tuple straight to a dict for
+orjson. UUIDs, datetimes and enums are left to orjson, and the GeoJSON text
+from PostGIS is embedded as an ``orjson.Fragment`` instead of being parsed.
+
+``fields=`` requests select a subset of the columns: ``projection()`` returns
+the columns and a serializer for it, so omitted geometries and JSONB columns
+are never read or encoded.
+"""
+
+import json
+from functools import lru_cache
+from typing import Callable, Iterable, NamedTuple, Optional, Tuple
+
+import orjson
+from sqlalchemy import func
+
+from app.models.parcela import Parcela
+from app.models.actividad import Actividad
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def _enum(value):
+    return value.value if value else None
+
+
+def _geojson(value):
+    return json.loads(value) if value else None
+
+
+def build_serializer(name: str, keys: Iterable[str], geojson: Iterable[str] = ()) -> Callable[[tuple], dict]:
+    """Compile ``def name(row): return {key: row[i], ...}`` for a fixed column order"""
+    geojson = set(geojson)
+    items = []
+    for i, key in enumerate(keys):
+        value = f"row[{i}]"
+        if key in geojson:
+            value = f"(_fragment(row[{i}]) if row[{i}] is not None else None)"
+        items.append(f"{key!r}: {value}")
+    
+    source = f"def {name}(row):\n    return {{{', '.join(items)}}}\n"
+    namespace = {"_fragment": orjson.Fragment}
+    exec(compile(source, f"<serializer {name}>", "exec"), namespace)
+    return namespace[name]
+
+
+class ParcelaDTO:
+    """Parcela row for list and sync responses"""
+    
+    __slots__ = (
+        "id", "nombre", "superficie", "superficie_calculada", "tipo_cultivo",
+        "cultivo", "variedad", "referencia_sigpac", "geometria", "centroide",
+        "bbox", "num_vertices", "geometria_hash", "propietario_id",
+        "organizacion_id", "activa", "descripcion", "configuracion",
+        "created_at", "updated_at"
+    )
+    
+    geojson_fields = ("geometria", "centroide", "bbox")
+    
+    columns = (
+        Parcela.id,
+        Parcela.nombre,
+        Parcela.superficie,
+        Parcela.superficie_calculada,
+        Parcela.tipo_cultivo,
+        Parcela.cultivo,
+        Parcela.variedad,
+        Parcela.referencia_sigpac,
+        func.ST_AsGeoJSON(Parcela.geometria).label("geometria"),
+        func.ST_AsGeoJSON(Parcela.centroide).label("centroide"),
+        func.ST_AsGeoJSON(Parcela.bbox).label("bbox"),
+        Parcela.num_vertices,
+        Parcela.geometria_hash,
+        Parcela.propietario_id,
+        Parcela.organizacion_id,
+        Parcela.activa,
+        Parcela.descripcion,
+        Parcela.configuracion,
+        Parcela.created_at,
+        Parcela.updated_at,
+    )
+    
+    def __init__(self, row):
+        (
+            self.id, self.nombre, self.superficie, self.superficie_calculada,
+            self.tipo_cultivo, self.cultivo, self.variedad, self.referencia_sigpac,
+            self.geometria, self.centroide, self.bbox, self.num_vertices,
+            self.geometria_hash, self.propietario_id, self.organizacion_id,
+            self.activa, self.descripcion, self.configuracion, self.created_at,
+            self.updated_at
+        ) = row
+    
+    def to_dict(self) -> dict:
+        """Same keys, in the same order, as Parcela.to_dict()"""
+        return {
+            "id": str(self.id),
+            "nombre": self.nombre,
+            "superficie": self.superficie,
+            "superficie_calculada": self.superficie_calculada,
+            "tipo_cultivo": _enum(self.tipo_cultivo),
+            "cultivo": self.cultivo,
+            "variedad": self.variedad,
+            "referencia_sigpac": self.referencia_sigpac,
+            "geometria": _geojson(self.geometria),
+            "centroide": _geojson(self.centroide),
+            "bbox": _geojson(self.bbox),
+            "num_vertices": self.num_vertices,
+            "geometria_hash": self.geometria_hash,
+            "propietario_id": self.propietario_id,
+            "organizacion_id": self.organizacion_id,
+            "activa": self.activa,
+            "descripcion": self.descripcion,
+            "configuracion": self.configuracion,
+            "created_at": _iso(self.created_at),
+            "updated_at": _iso(self.updated_at)
+        }
+
+
+class ActividadDTO:
+    """Actividad row for list and sync responses"""
+    
+    __slots__ = (
+        "id", "tipo", "nombre", "descripcion", "parcela_id", "usuario_id",
+        "organizacion_id", "fecha", "duracion_horas", "estado", "coordenadas",
+        "superficie_afectada", "productos", "maquinaria", "costo_mano_obra",
+        "costo_productos", "costo_maquinaria", "costo_total",
+        "condiciones_meteorologicas", "documentos_ocr", "imagenes", "notas",
+        "configuracion", "created_at", "updated_at"
+    )
+    
+    geojson_fields = ("coordenadas",)
+    
+    columns = (
+        Actividad.id,
+        Actividad.tipo,
+        Actividad.nombre,
+        Actividad.descripcion,
+        Actividad.parcela_id,
+        Actividad.usuario_id,
+        Actividad.organizacion_id,
+        Actividad.fecha,
+        Actividad.duracion_horas,
+        Actividad.estado,
+        func.ST_AsGeoJSON(Actividad.coordenadas).label("coordenadas"),
+        Actividad.superficie_afectada,
+        Actividad.productos,
+        Actividad.maquinaria,
+        Actividad.costo_mano_obra,
+        Actividad.costo_productos,
+        Actividad.costo_maquinaria,
+        Actividad.costo_total,
+        Actividad.condiciones_meteorologicas,
+        Actividad.documentos_ocr,
+        Actividad.imagenes,
+        Actividad.notas,
+        Actividad.configuracion,
+        Actividad.created_at,
+        Actividad.updated_at,
+    )
+    
+    def __init__(self, row):
+        (
+            self.id, self.tipo, self.nombre, self.descripcion, self.parcela_id,
+            self.usuario_id, self.organizacion_id, self.fecha, self.duracion_horas,
+            self.estado, self.coordenadas, self.superficie_afectada, self.productos,
+            self.maquinaria, self.costo_mano_obra, self.costo_productos,
+            self.costo_maquinaria, self.costo_total, self.condiciones_meteorologicas,
+            self.documentos_ocr, self.imagenes, self.notas, self.configuracion,
+            self.created_at, self.updated_at
+        ) = row
+    
+    def to_dict(self) -> dict:
+        """Same keys, in the same order, as Actividad.to_dict()"""
+        return {
+            "id": str(self.id),
+            "tipo": _enum(self.tipo),
+            "nombre": self.nombre,
+            "descripcion": self.descripcion,
+            "parcela_id": str(self.parcela_id),
+            "usuario_id": self.usuario_id,
+            "organizacion_id": self.organizacion_id,
+            "fecha": _iso(self.fecha),
+            "duracion_horas": self.duracion_horas,
+            "estado": _enum(self.estado),
+            "coordenadas": _geojson(self.coordenadas),
+            "superficie_afectada": self.superficie_afectada,
+            "productos": self.productos,
+            "maquinaria": self.maquinaria,
+            "costo_mano_obra": self.costo_mano_obra,
+            "costo_productos": self.costo_productos,
+            "costo_maquinaria": self.costo_maquinaria,
+            "costo_total": self.costo_total,
+            "condiciones_meteorologicas": self.condiciones_meteorologicas,
+            "documentos_ocr": self.documentos_ocr,
+            "imagenes": self.imagenes,
+            "notas": self.notas,
+            "configuracion": self.configuracion,
+            "created_at": _iso(self.created_at),
+            "updated_at": _iso(self.updated_at)
+        }
+
+
+ParcelaDTO.serialize = staticmethod(build_serializer(
+    "serialize_parcela", ParcelaDTO.__slots__, geojson=ParcelaDTO.geojson_fields
+))
+ActividadDTO.serialize = staticmethod(build_serializer(
+    "serialize_actividad", ActividadDTO.__slots__, geojson=ActividadDTO.geojson_fields
+))
+
+
+class Projection(NamedTuple):
+    """Columns and serializer for a subset of a DTO's fields"""
+    columns: tuple
+    serialize: Callable[[tuple], dict]
+
+
+def parse_fields(dto_class, fields: Optional[str], required: Iterable[str] = ("id",)) -> Optional[Tuple[str, ...]]:
+    """Field names from a ``fields=a,b`` parameter, plus ``required``, in column order
+
+    None when no fields were requested; ValueError naming any unknown field.
+    """
+    if not fields:
+        return None
+    
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested.difference(dto_class.__slots__)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    
+    requested.update(required)
+    return tuple(name for name in dto_class.__slots__ if name in requested)
+
+
+@lru_cache(maxsize=256)
+def projection(dto_class, fields: Optional[Tuple[str, ...]] = None) -> Projection:
+    """Projection of ``fields`` (as returned by parse_fields), or of every column"""
+    if fields is None:
+        return Projection(dto_class.columns, dto_class.serialize)
+    
+    by_name = dict(zip(dto_class.__slots__, dto_class.columns))
+    serialize = build_serializer(
+        f"serialize_{dto_class.__name__.lower()}", fields,
+        geojson=[name for name in fields if name in dto_class.geojson_fields]
+    )
+    return Projection(tuple(by_name[name] for name in fields), serialize)
+
+
+async def fetch_dicts(db, dto_class, query) -> list:
+    """Execute a projection of ``dto_class.columns`` and serialize each row for orjson
+
+    ``dto_class`` may also be a Projection, for queries built from its columns.
+    """
+    result = await db.execute(query)
+    serialize = dto_class.serialize
+    return [serialize(row) for row in result]
@@ -2,16 +2,31 @@
 Parcela model - Equivalent to Node.js Parcela model
 """
 
-from sqlalchemy import Column, String, Float, Boolean, DateTime, Enum, Text, JSON
+from sqlalchemy import Column, String, Float, Integer, Boolean, DateTime, Enum, Text, JSON
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 from geoalchemy2 import Geometry
 import uuid
 import enum
 from datetime import datetime
+from loguru import logger
 
 from app.database.connection import Base
 
+try:
+    from geoalchemy2.shape import to_shape
+    SHAPELY_AVAILABLE = True
+except ImportError:
+    SHAPELY_AVAILABLE = False
+    logger.warning("shapely not available. Parcela.to_dict() will return geometries as None.")
+
+
+def _geojson(element):
+    """GeoJSON dict of a geometry column, as ParcelaDTO returns it"""
+    if element is None or not SHAPELY_AVAILABLE:
+        return None
+    return to_shape(element).__geo_interface__
+
 
 class TipoCultivo(str, enum.Enum):
     """Tipos de cultivo disponibles"""
@@ -36,6 +51,7 @@ class Parcela(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     nombre = Column(String(255), nullable=False)
     superficie = Column(Float, nullable=False)  # hectáreas
+    superficie_calculada = Column(Float, nullable=True)  # hectáreas, geodesic area of geometria (trigger)
     
     # Cultivo information
     tipo_cultivo = Column(Enum(TipoCultivo), nullable=False)
@@ -46,8 +62,13 @@ class Parcela(Base):
     referencia_sigpac = Column(String(50), nullable=True, unique=True)
     
     # Geospatial data
-    geometria = Column(Geometry('POLYGON', srid=4326), nullable=True)
-    centroide = Column(Geometry('POINT', srid=4326), nullable=True)
+    geometria = Column(Geometry('POLYGON', srid=4326), nullable=True)  # simplified copies by trigger (migrations/0004)
+    centroide = Column(Geometry('POINT', srid=4326), nullable=True)  # ST_PointOnSurface when geometria is set
+    
+    # Derived from geometria by trigger (migrations/0007)
+    bbox = Column(Geometry('GEOMETRY', srid=4326), nullable=True)
+    num_vertices = Column(Integer, nullable=True)
+    geometria_hash = Column(String(32), nullable=True)
     
     # Ownership and status
     propietario_id = Column(String(255), nullable=False)  # Clerk user ID
@@ -71,12 +92,16 @@ class Parcela(Base):
             "id": str(self.id),
             "nombre": self.nombre,
             "superficie": self.superficie,
+            "superficie_calculada": self.superficie_calculada,
             "tipo_cultivo": self.tipo_cultivo.value if self.tipo_cultivo else None,
             "cultivo": self.cultivo,
             "variedad": self.variedad,
             "referencia_sigpac": self.referencia_sigpac,
-            "geometria": self.geometria,
-            "centroide": self.centroide,
+            "geometria": _geojson(self.geometria),
+            "centroide": _geojson(self.centroide),
+            "bbox": _geojson(self.bbox),
+            "num_vertices": self.num_vertices,
+            "geometria_hash": self.geometria_hash,
             "propietario_id": self.propietario_id,
             "organizacion_id": self.organizacion_id,
             "activa": self.activa,
@@ -3,16 +3,21 @@ Actividades routes - Equivalent to Node.js actividades endpoints
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from typing import List, Optional
+from sqlalchemy import select, or_
+from typing import List, Literal, Optional
 from uuid import UUID
 from datetime import datetime, date
 from loguru import logger
 
-from app.database.connection import get_async_session
+from app.database.connection import get_async_session, get_read_session
+from app.database.counts import count_total
+from app.database.pagination import after_cursor, decode_cursor, split_page
 from app.models.actividad import Actividad, TipoActividad, EstadoActividad
+from app.models.dto import ActividadDTO, fetch_dicts, parse_fields, projection
 from app.middleware.auth import get_current_user
+from app.services.map_cache import tile_cache
 
 router = APIRouter()
 
@@ -26,14 +31,30 @@ async def get_actividades(
     estado: Optional[EstadoActividad] = Query(None),
     fecha_desde: Optional[date] = Query(None),
     fecha_hasta: Optional[date] = Query(None),
-    db: AsyncSession = Depends(get_async_session),
+    producto: Optional[str] = Query(None, description="Nombre exacto de un producto utilizado"),
+    registro_sanitario: Optional[str] = Query(None, description="Número de registro de un producto"),
+    maquina: Optional[str] = Query(None, description="Nombre o matrícula de la maquinaria"),
+    cursor: Optional[str] = Query(None, description="pagination.next_cursor of the previous page; replaces skip"),
+    count: Literal["exact", "estimated", "none"] = Query("exact", description="How pagination.total is computed"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return; id and fecha are always included"),
+    db: AsyncSession = Depends(get_read_session),
     current_user: dict = Depends(get_current_user)
 ):
     """Get user's actividades with pagination and filters"""
     
     try:
-        # Build query
-        query = select(Actividad).where(Actividad.usuario_id == current_user["id"])
+        keyset = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    try:
+        projected = projection(ActividadDTO, parse_fields(ActividadDTO, fields, required=("id", "fecha")))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        # Build query over the requested columns only
+        query = select(*projected.columns).where(Actividad.usuario_id == current_user["id"])
         
         # Apply filters
         if parcela_id:
@@ -51,31 +72,47 @@ async def get_actividades(
         if fecha_hasta:
             query = query.where(Actividad.fecha <= fecha_hasta)
         
-        # Count total
-        count_query = select(func.count()).select_from(query.subquery())
-        total_result = await db.execute(count_query)
-        total = total_result.scalar()
-        
-        # Apply pagination and ordering
-        query = query.offset(skip).limit(limit).order_by(Actividad.fecha.desc())
-        
-        # Execute query
-        result = await db.execute(query)
-        actividades = result.scalars().all()
-        
-        # Convert to dict
-        actividades_data = [actividad.to_dict() for actividad in actividades]
-        
-        return {
+        # JSONB containment, served by the GIN (jsonb_path_ops) indexes
+        if producto:
+            query = query.where(Actividad.productos.contains([{"nombre": producto}]))
+        
+        if registro_sanitario:
+            query = query.where(Actividad.productos.contains([{"numero_registro": registro_sanitario}]))
+        
+        if maquina:
+            query = query.where(or_(
+                Actividad.maquinaria.contains([{"nombre": maquina}]),
+                Actividad.maquinaria.contains([{"matricula": maquina}])
+            ))
+        
+        # Count total (per-user counter when estimating an unfiltered list)
+        filtered = any(value is not None for value in (
+            parcela_id, tipo, estado, fecha_desde, fecha_hasta, producto, registro_sanitario, maquina
+        ))
+        total = await count_total(db, query, count, current_user["id"], "actividades", filtered)
+        
+        # Apply pagination and ordering: keyset after a cursor, offset for older
+        # clients. One extra row tells whether there is a next page.
+        if keyset:
+            query = after_cursor(query, Actividad.fecha, Actividad.id, keyset)
+        else:
+            query = query.offset(skip)
+        query = query.limit(limit + 1).order_by(Actividad.fecha.desc(), Actividad.id.desc())
+        
+        # Execute projected query and convert to dict
+        actividades_data, next_cursor = split_page(await fetch_dicts(db, projected, query), limit, "fecha")
+        
+        pagination = {"total": total, "count_mode": count, "limit": limit, "next_cursor": next_cursor}
+        if not keyset:
+            pagination["page"] = (skip // limit) + 1
+            pagination["total_pages"] = (total + limit - 1) // limit if total is not None else None
+        
+        # Rows hold orjson fragments, so skip FastAPI's jsonable_encoder
+        return ORJSONResponse({
             "success": True,
             "data": actividades_data,
-            "pagination": {
-                "total": total,
-                "page": (skip // limit) + 1,
-                "limit": limit,
-                "total_pages": (total + limit - 1) // limit
-            }
-        }
+            "pagination": pagination
+        })
         
     except Exception as e:
         logger.error(f"Error getting actividades: {e}")
@@ -147,6 +184,7 @@ async def create_actividad(
         # Add to database
         db.add(actividad)
         await db.commit()
+        tile_cache.invalidate_user(current_user["id"])  # tiles carry the last activity
         await db.refresh(actividad)
         
         logger.info(f"Created actividad {actividad.id} for user {current_user['id']}")
@@ -209,6 +247,7 @@ async def update_actividad(
             actividad.costo_total = total if total > 0 else None
         
         await db.commit()
+        tile_cache.invalidate_user(current_user["id"])
         await db.refresh(actividad)
         
         logger.info(f"Updated actividad {actividad_id} for user {current_user['id']}")
@@ -251,6 +290,7 @@ async def delete_actividad(
         # Delete permanently
         await db.delete(actividad)
         await db.commit()
+        tile_cache.invalidate_user(current_user["id"])
         
         logger.info(f"Deleted actividad {actividad_id} for user {current_user['id']}")
         
@@ -271,7 +311,7 @@ async def delete_actividad(
 async def get_actividades_stats(
     fecha_desde: Optional[date] = Query(None),
     fecha_hasta: Optional[date] = Query(None),
-    db: AsyncSession = Depends(get_async_session),
+    db: AsyncSession = Depends(get_read_session),
     current_user: dict = Depends(get_current_user)
 ):
     """Get actividades statistics summary"""
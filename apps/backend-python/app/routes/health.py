@@ -6,7 +6,14 @@ from fastapi import APIRouter, Depends
 from datetime import datetime
 from loguru import logger
 
-from app.database.connection import check_db_health, get_db_info
+from app.database.connection import check_db_health, get_db_info, get_pool_info
+from app.database.query_stats import route_query_summary
+from app.database.slow_queries import slow_query_log
+from app.config.settings import settings
+from app.middleware.auth import require_admin
+from app.middleware.compression import compression_cache
+from app.services.map_cache import tile_cache
+from app.services.location_index import location_index
 
 router = APIRouter()
 
@@ -57,6 +64,29 @@ async def detailed_health_check():
     }
 
 
+@router.get("/slow-queries")
+async def slow_queries(current_user: dict = Depends(require_admin)):
+    """Slowest distinct queries with their EXPLAIN (ANALYZE, BUFFERS) plans (admin only)"""
+    
+    return {
+        "success": True,
+        "data": {
+            "enabled": settings.SLOW_QUERY_CAPTURE_ENABLED,
+            "threshold_ms": settings.SLOW_QUERY_THRESHOLD_MS,
+            "capacity": slow_query_log.capacity,
+            "queries": slow_query_log.entries()
+        }
+    }
+
+
+@router.delete("/slow-queries")
+async def clear_slow_queries(current_user: dict = Depends(require_admin)):
+    """Empty the slow query buffer (admin only)"""
+    
+    slow_query_log.clear()
+    return {"success": True, "message": "Slow query buffer cleared"}
+
+
 @router.get("/metrics")
 async def health_metrics():
     """Health metrics for monitoring"""
@@ -69,12 +99,16 @@ async def health_metrics():
         "uptime": "running",
         "database": {
             "connected": db_healthy,
-            "connection_pool": db_info.get("pool_info", {}),
+            "connection_pool": get_pool_info(),
             "postgis_enabled": "postgis_version" in db_info
         },
         "performance": {
             "response_time_ms": 1,  # Will be updated by middleware
             "requests_per_second": 0,  # Will be updated by middleware
             "error_rate": 0
-        }
+        },
+        "queries_per_route": route_query_summary.snapshot(),
+        "tile_cache": tile_cache.info(),
+        "location_index": location_index.info(),
+        "compression_cache": compression_cache.info()
     }
\ No newline at end of file
@@ -2,22 +2,387 @@
 Parcelas routes - Equivalent to Node.js parcelas endpoints
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from typing import List, Optional
+from sqlalchemy import select
+from typing import List, Literal, Optional, Tuple
 from uuid import UUID
-from datetime import datetime, date
+from datetime import date, datetime, timezone
+import hashlib
+import json
 from loguru import logger
 
-from app.database.connection import get_async_session
+from app.config.settings import settings
+from app.database.connection import get_async_session, get_read_session
+from app.database.prepared_statements import prepared_statements
+from app.database.counts import count_total
+from app.database.pagination import after_cursor, decode_cursor, split_page
 from app.models.parcela import Parcela, TipoCultivo
+from app.models.dto import ParcelaDTO, fetch_dicts, parse_fields, projection
 from app.middleware.auth import get_current_user
+from app.services.map_cache import tile_cache
+from app.services.location_index import location_index
 from app.services.sigpac_real import sigpac_service
 
 router = APIRouter()
 
 
+# Raw PostGIS queries, prepared once per pooled connection
+
+# Parcelas with their latest matching activity in one statement; optional
+# filters are NULL when unused so the SQL text (and prepared plan) is stable
+MAP_DATA_FROM = """
+    FROM parcelas p
+    LEFT JOIN LATERAL (
+        SELECT a.id, a.tipo, a.nombre, a.fecha, a.estado
+        FROM actividades a
+        WHERE a.parcela_id = p.id
+            AND a.usuario_id = :user_id
+            AND (CAST(:tipos_actividad AS text[]) IS NULL OR a.tipo::text = ANY(CAST(:tipos_actividad AS text[])))
+            AND (CAST(:fecha_desde AS date) IS NULL OR a.fecha >= CAST(:fecha_desde AS date))
+            AND (CAST(:fecha_hasta AS date) IS NULL OR a.fecha <= CAST(:fecha_hasta AS date))
+        ORDER BY a.fecha DESC
+        LIMIT 1
+    ) ua ON true
+    WHERE p.propietario_id = :user_id 
+    AND p.activa = true
+    AND (
+        CAST(:cultivos AS text[]) IS NULL
+        OR p.tipo_cultivo::text = ANY(CAST(:cultivos AS text[]))
+        OR p.cultivo = ANY(CAST(:cultivos AS text[]))
+    )
+    AND (NOT CAST(:solo_con_actividad AS boolean) OR ua.id IS NOT NULL)
+"""
+
+# Viewport filter, kept out of MAP_DATA_FROM so the bbox statements always
+# carry an indexable condition on the GIST index
+MAP_DATA_BBOX_FILTER = """
+    AND ST_Intersects(
+        p.geometria,
+        ST_MakeEnvelope(CAST(:min_lng AS float8), CAST(:min_lat AS float8), CAST(:max_lng AS float8), CAST(:max_lat AS float8), 4326)
+    )
+"""
+
+# Simplified copy for the requested zoom (migrations/0004); full geometry without zoom
+MAP_DATA_GEOMETRY = """CASE
+            WHEN CAST(:zoom AS int) IS NULL OR CAST(:zoom AS int) > 16 THEN p.geometria
+            WHEN CAST(:zoom AS int) > 13 THEN p.geometria_z16
+            WHEN CAST(:zoom AS int) > 10 THEN p.geometria_z13
+            ELSE p.geometria_z10
+        END"""
+
+MAP_DATA_SELECT = """
+    SELECT 
+        p.id,
+        p.nombre,
+        p.superficie,
+        p.tipo_cultivo,
+        p.cultivo,
+        p.variedad,
+        p.activa,
+        p.referencia_sigpac,
+        p.referencias_catastrales,
+        ST_AsGeoJSON(""" + MAP_DATA_GEOMETRY + """) as geometria_geojson,
+        ST_X(p.centroide) as centroide_lng,
+        ST_Y(p.centroide) as centroide_lat,
+        p.created_at,
+        p.updated_at,
+        ua.id as actividad_id,
+        ua.tipo::text as actividad_tipo,
+        ua.nombre as actividad_nombre,
+        ua.fecha as actividad_fecha,
+        ua.estado::text as actividad_estado,
+        CURRENT_DATE - ua.fecha::date as actividad_dias_desde
+"""
+
+# One GeoJSON Feature per row, serialized by Postgres
+MAP_FEATURES_SELECT = """
+    SELECT json_build_object(
+        'type', 'Feature',
+        'id', p.id,
+        'geometry', ST_AsGeoJSON(""" + MAP_DATA_GEOMETRY + """)::json,
+        'properties', json_build_object(
+            'id', p.id,
+            'nombre', p.nombre,
+            'superficie', p.superficie,
+            'tipo_cultivo', p.tipo_cultivo,
+            'cultivo', p.cultivo,
+            'variedad', p.variedad,
+            'activa', p.activa,
+            'referencia_sigpac', p.referencia_sigpac,
+            'referencias_catastrales', p.referencias_catastrales,
+            'centroide', CASE WHEN p.centroide IS NULL THEN NULL
+                ELSE json_build_object('lat', ST_Y(p.centroide), 'lng', ST_X(p.centroide)) END,
+            'created_at', p.created_at,
+            'updated_at', p.updated_at,
+            'ultima_actividad', CASE WHEN ua.id IS NULL THEN NULL ELSE json_build_object(
+                'id', ua.id,
+                'tipo', ua.tipo,
+                'nombre', ua.nombre,
+                'fecha', ua.fecha,
+                'dias_desde', CURRENT_DATE - ua.fecha::date,
+                'estado', ua.estado
+            ) END
+        )
+    )::text AS feature
+"""
+
+MAP_DATA_QUERY = prepared_statements.register("parcelas_map_data", MAP_DATA_SELECT + MAP_DATA_FROM)
+MAP_DATA_BBOX_QUERY = prepared_statements.register(
+    "parcelas_map_data_bbox", MAP_DATA_SELECT + MAP_DATA_FROM + MAP_DATA_BBOX_FILTER
+)
+MAP_FEATURES_QUERY = prepared_statements.register("parcelas_map_features", MAP_FEATURES_SELECT + MAP_DATA_FROM)
+MAP_FEATURES_BBOX_QUERY = prepared_statements.register(
+    "parcelas_map_features_bbox", MAP_FEATURES_SELECT + MAP_DATA_FROM + MAP_DATA_BBOX_FILTER
+)
+
+# Grid clusters of parcela centroids (same filters as map-data, no viewport so
+# the result can be cached per user and zoom)
+MAP_CLUSTERS_QUERY = prepared_statements.register("parcelas_map_clusters", """
+    SELECT
+        count(*) AS parcelas,
+        sum(c.superficie) AS superficie,
+        mode() WITHIN GROUP (ORDER BY c.tipo_cultivo)::text AS tipo_cultivo_dominante,
+        avg(ST_X(c.punto)) AS lng,
+        avg(ST_Y(c.punto)) AS lat,
+        min(ST_X(c.punto)) AS min_lng,
+        min(ST_Y(c.punto)) AS min_lat,
+        max(ST_X(c.punto)) AS max_lng,
+        max(ST_Y(c.punto)) AS max_lat
+    FROM (
+        SELECT p.superficie, p.tipo_cultivo, p.centroide AS punto
+""" + MAP_DATA_FROM + """
+    ) c
+    WHERE c.punto IS NOT NULL
+    GROUP BY ST_SnapToGrid(c.punto, CAST(:cell_size AS float8))
+""")
+
+# Bytes per chunk written to the client while streaming features
+MAP_FEATURES_CHUNK_SIZE = 64 * 1024
+
+# Mapbox Vector Tile of the user's parcelas with last-activity attributes
+TILE_QUERY = prepared_statements.register("parcelas_tile", """
+    WITH bounds AS (
+        SELECT ST_TileEnvelope(:z, :x, :y) AS geom
+    ),
+    features AS (
+        SELECT
+            ST_AsMVTGeom(ST_Transform(CASE
+                WHEN :z > 16 THEN p.geometria
+                WHEN :z > 13 THEN p.geometria_z16
+                WHEN :z > 10 THEN p.geometria_z13
+                ELSE p.geometria_z10
+            END, 3857), b.geom, 4096, 64, true) AS geom,
+            p.id::text AS id,
+            p.nombre,
+            p.tipo_cultivo::text AS tipo_cultivo,
+            p.superficie,
+            ua.tipo::text AS ultima_actividad_tipo,
+            to_char(ua.fecha, 'YYYY-MM-DD') AS ultima_actividad_fecha,
+            CURRENT_DATE - ua.fecha::date AS dias_desde_actividad
+        FROM parcelas p
+        CROSS JOIN bounds b
+        LEFT JOIN LATERAL (
+            SELECT a.tipo, a.fecha
+            FROM actividades a
+            WHERE a.parcela_id = p.id AND a.usuario_id = :user_id
+            ORDER BY a.fecha DESC
+            LIMIT 1
+        ) ua ON true
+        WHERE p.propietario_id = :user_id
+            AND p.activa = true
+            AND (CAST(:organizacion_id AS text) IS NULL OR p.organizacion_id = CAST(:organizacion_id AS text))
+            AND p.geometria && ST_Transform(b.geom, 4326)
+    )
+    SELECT ST_AsMVT(features, 'parcelas', 4096, 'geom') FROM features
+""")
+
+MVT_MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+
+
+def _tile_response(tile: bytes, if_none_match: Optional[str], cache_status: str) -> Response:
+    """Tile revalidated on every use: 304 when the client already has these bytes
+
+    The ETag is a digest of the tile itself rather than the tile_cache
+    generation, which is per worker and would not match across workers.
+    It is weak because the compression middleware may re-encode the body.
+    """
+    etag = f'W/"{hashlib.blake2b(tile, digest_size=16).hexdigest()}"'
+    headers = {"Cache-Control": "private, no-cache", "ETag": etag, "X-Tile-Cache": cache_status}
+    if if_none_match and etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=tile, media_type=MVT_MEDIA_TYPE, headers=headers)
+
+
+
+def map_data_params(
+    user_id: str,
+    cultivos: Optional[List[str]] = None,
+    tipos_actividad: Optional[List[str]] = None,
+    fecha_desde: Optional[date] = None,
+    fecha_hasta: Optional[date] = None,
+    solo_con_actividad: bool = False,
+    bbox: Optional[Tuple[float, float, float, float]] = None,
+    zoom: Optional[int] = None
+) -> dict:
+    """Bind parameters for the map data queries (unused filters bound as NULL)"""
+    min_lng, min_lat, max_lng, max_lat = bbox or (None, None, None, None)
+    return {
+        "user_id": user_id,
+        "cultivos": cultivos or None,
+        "tipos_actividad": tipos_actividad or None,
+        "fecha_desde": fecha_desde,
+        "fecha_hasta": fecha_hasta,
+        "solo_con_actividad": solo_con_actividad,
+        "min_lng": min_lng,
+        "min_lat": min_lat,
+        "max_lng": max_lng,
+        "max_lat": max_lat,
+        "zoom": zoom
+    }
+
+
+async def get_map_clusters(db: AsyncSession, user_id: str, zoom: int, **filters) -> list:
+    """Grid clusters of the user's parcelas at ``zoom``, cached until their next write"""
+    cache_key = ("clusters", zoom, json.dumps(filters, sort_keys=True, default=str))
+    cached = tile_cache.get(user_id, cache_key)
+    if cached is not None:
+        return json.loads(cached)
+    
+    generation = tile_cache.generation(user_id)
+    cell_size = 360 / (256 * 2 ** zoom) * settings.MAP_CLUSTER_CELL_PX
+    result = await db.execute(MAP_CLUSTERS_QUERY, {
+        **map_data_params(user_id, **filters),
+        "cell_size": cell_size
+    })
+    
+    clusters = [
+        {
+            "lat": row.lat,
+            "lng": row.lng,
+            "count": row.parcelas,
+            "superficie": round(row.superficie or 0, 2),
+            "tipo_cultivo_dominante": row.tipo_cultivo_dominante,
+            "bbox": [row.min_lng, row.min_lat, row.max_lng, row.max_lat]
+        }
+        for row in result
+    ]
+    tile_cache.put(user_id, cache_key, json.dumps(clusters).encode(), generation)
+    return clusters
+
+
+def parse_bbox(bbox: Optional[str]) -> Optional[Tuple[float, float, float, float]]:
+    """Parse a ``minLng,minLat,maxLng,maxLat`` viewport (400 if malformed)"""
+    if not bbox:
+        return None
+    
+    try:
+        min_lng, min_lat, max_lng, max_lat = (float(value) for value in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox must be minLng,minLat,maxLng,maxLat")
+    
+    if min_lng > max_lng or min_lat > max_lat:
+        raise HTTPException(status_code=400, detail="bbox minimums must not exceed maximums")
+    return min_lng, min_lat, max_lng, max_lat
+
+# Geodesic area; parcelas store it on write (migrations/0006), so this only
+# runs for rows the recompute job has not reached yet
+SUPERFICIE_QUERY = prepared_statements.register("parcelas_superficie", """
+    SELECT ST_Area(geometria::geography) / 10000 as area_hectares
+    FROM parcelas 
+    WHERE id = :parcela_id
+""")
+
+# Nearest parcelas to a point: the GIST index yields candidates in <-> order
+# (no full sort; a containing parcela is at distance 0, so always among them),
+# then the few candidates are ranked by containment and true distance in
+# metres. Extra candidates absorb the difference between planar degree
+# distance and geodesic distance.
+FIND_BY_LOCATION_CANDIDATES = 20
+
+FIND_BY_LOCATION_QUERY = prepared_statements.register("parcelas_find_by_location", """
+    WITH candidatos AS (
+        SELECT p.id, p.nombre, p.superficie, p.tipo_cultivo, p.cultivo, p.geometria
+        FROM parcelas p
+        WHERE p.propietario_id = :user_id 
+            AND p.activa = true
+            AND p.geometria IS NOT NULL
+        ORDER BY p.geometria <-> ST_SetSRID(ST_MakePoint(CAST(:lng AS float8), CAST(:lat AS float8)), 4326)
+        LIMIT CAST(:candidates AS int)
+    )
+    SELECT 
+        c.id,
+        c.nombre,
+        c.superficie,
+        c.tipo_cultivo,
+        c.cultivo,
+        ST_Distance(
+            c.geometria::geography,
+            ST_SetSRID(ST_MakePoint(CAST(:lng AS float8), CAST(:lat AS float8)), 4326)::geography
+        ) as distance_meters,
+        ST_Intersects(c.geometria, ST_SetSRID(ST_MakePoint(CAST(:lng AS float8), CAST(:lat AS float8)), 4326)) as within_parcela
+    FROM candidatos c
+    ORDER BY within_parcela DESC, distance_meters ASC
+    LIMIT 5
+""")
+
+
+# GPS fixes resolved to the containing parcela (or the nearest one within
+# :tolerance metres) in one lateral spatial join, then run-length encoded
+# into consecutive intervals per parcela (gaps and islands over time order)
+LOCATE_BATCH_QUERY = prepared_statements.register("parcelas_locate_batch", """
+    WITH puntos AS (
+        SELECT t.ord, t.ts, ST_SetSRID(ST_MakePoint(t.lng, t.lat), 4326) AS geom
+        FROM unnest(
+            CAST(:lngs AS float8[]), CAST(:lats AS float8[]), CAST(:timestamps AS timestamptz[])
+        ) WITH ORDINALITY AS t(lng, lat, ts, ord)
+    ),
+    asignados AS (
+        SELECT pt.ord, pt.ts, m.id AS parcela_id, m.nombre, coalesce(m.dentro, false) AS dentro
+        FROM puntos pt
+        LEFT JOIN LATERAL (
+            SELECT p.id, p.nombre, ST_Intersects(p.geometria, pt.geom) AS dentro
+            FROM parcelas p
+            WHERE p.propietario_id = :user_id
+                AND p.activa = true
+                -- index-assisted prefilter in degrees (a degree of longitude is the shortest)
+                AND ST_DWithin(
+                    p.geometria, pt.geom,
+                    CAST(:tolerance AS float8) / (111320 * greatest(cos(radians(ST_Y(pt.geom))), 0.01))
+                )
+                AND ST_DWithin(p.geometria::geography, pt.geom::geography, CAST(:tolerance AS float8))
+            ORDER BY ST_Intersects(p.geometria, pt.geom) DESC, p.geometria <-> pt.geom
+            LIMIT 1
+        ) m ON true
+    ),
+    tramos AS (
+        SELECT *,
+            row_number() OVER (ORDER BY ts, ord)
+            - row_number() OVER (PARTITION BY parcela_id ORDER BY ts, ord) AS tramo
+        FROM asignados
+    )
+    SELECT
+        parcela_id,
+        min(nombre) AS nombre,
+        min(ts) AS inicio,
+        max(ts) AS fin,
+        count(*) AS puntos,
+        count(*) FILTER (WHERE dentro) AS puntos_dentro
+    FROM tramos
+    GROUP BY parcela_id, tramo
+    ORDER BY min(ts), min(ord)
+""")
+
+
+def _parse_gps_timestamp(value) -> datetime:
+    """ISO 8601 string or epoch milliseconds (as sent by JS clients)"""
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value / 1000, tz=timezone.utc)
+    moment = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
 async def _enrich_with_sigpac_data(parcela_data: dict):
     """Enriquecer datos de parcela con información real de SIGPAC"""
     try:
@@ -110,14 +475,27 @@ async def get_parcelas(
     activa: Optional[bool] = Query(True),  # Default to True to only show active parcelas
     tipo_cultivo: Optional[TipoCultivo] = Query(None),
     include_deleted: bool = Query(False),  # Add explicit parameter to include deleted parcelas
-    db: AsyncSession = Depends(get_async_session),
+    cursor: Optional[str] = Query(None, description="pagination.next_cursor of the previous page; replaces skip"),
+    count: Literal["exact", "estimated", "none"] = Query("exact", description="How pagination.total is computed"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return; id and created_at are always included"),
+    db: AsyncSession = Depends(get_read_session),
     current_user: dict = Depends(get_current_user)
 ):
     """Get user's parcelas with pagination and filters"""
     
     try:
-        # Build query
-        query = select(Parcela).where(Parcela.propietario_id == current_user["id"])
+        keyset = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    try:
+        projected = projection(ParcelaDTO, parse_fields(ParcelaDTO, fields, required=("id", "created_at")))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        # Build query over the requested columns only
+        query = select(*projected.columns).where(Parcela.propietario_id == current_user["id"])
         
         # Apply filters - by default only show active parcelas unless explicitly requested
         if include_deleted:
@@ -131,31 +509,32 @@ async def get_parcelas(
         if tipo_cultivo:
             query = query.where(Parcela.tipo_cultivo == tipo_cultivo)
         
-        # Count total
-        count_query = select(func.count()).select_from(query.subquery())
-        total_result = await db.execute(count_query)
-        total = total_result.scalar()
+        # Count total (per-user counter when estimating the default active list)
+        filtered = include_deleted or tipo_cultivo is not None
+        total = await count_total(db, query, count, current_user["id"], "parcelas", filtered)
         
-        # Apply pagination
-        query = query.offset(skip).limit(limit).order_by(Parcela.created_at.desc())
+        # Apply pagination: keyset after a cursor, offset for older clients.
+        # One extra row tells whether there is a next page.
+        if keyset:
+            query = after_cursor(query, Parcela.created_at, Parcela.id, keyset)
+        else:
+            query = query.offset(skip)
+        query = query.limit(limit + 1).order_by(Parcela.created_at.desc(), Parcela.id.desc())
         
-        # Execute query
-        result = await db.execute(query)
-        parcelas = result.scalars().all()
+        # Execute projected query and convert to dict
+        parcelas_data, next_cursor = split_page(await fetch_dicts(db, projected, query), limit, "created_at")
         
-        # Convert to dict
-        parcelas_data = [parcela.to_dict() for parcela in parcelas]
+        pagination = {"total": total, "count_mode": count, "limit": limit, "next_cursor": next_cursor}
+        if not keyset:
+            pagination["page"] = (skip // limit) + 1
+            pagination["total_pages"] = (total + limit - 1) // limit if total is not None else None
         
-        return {
+        # Rows hold orjson fragments, so skip FastAPI's jsonable_encoder
+        return ORJSONResponse({
             "success": True,
             "data": parcelas_data,
-            "pagination": {
-                "total": total,
-                "page": (skip // limit) + 1,
-                "limit": limit,
-                "total_pages": (total + limit - 1) // limit
-            }
-        }
+            "pagination": pagination
+        })
         
     except Exception as e:
         logger.error(f"Error getting parcelas: {e}")
@@ -164,115 +543,81 @@ async def get_parcelas(
 
 @router.get("/map-data")
 async def get_map_data(
-    cultivos: Optional[List[str]] = Query(None),
+    cultivos: Optional[List[str]] = Query(None, description="Tipo de cultivo o nombre del cultivo"),
     tipos_actividad: Optional[List[str]] = Query(None),
     fecha_desde: Optional[date] = Query(None),
     fecha_hasta: Optional[date] = Query(None),
     solo_con_actividad: bool = Query(False),
-    db: AsyncSession = Depends(get_async_session),
+    bbox: Optional[str] = Query(None, description="Viewport: minLng,minLat,maxLng,maxLat"),
+    zoom: Optional[int] = Query(None, ge=0, le=24, description="Map zoom; selects a simplified geometry"),
+    db: AsyncSession = Depends(get_read_session),
     current_user: dict = Depends(get_current_user)
 ):
     """Get enriched parcelas data for map visualization with GeoJSON geometries"""
     
+    viewport = parse_bbox(bbox)
+    
     try:
-        from app.models.actividad import Actividad
-        from sqlalchemy import text
-        import json
-        
-        logger.info(f"🗺️ Loading map data for user: {current_user}")
-        logger.info(f"🔍 User ID for query: {current_user['id']}")
-        
-        # First, let's check if there are any parcelas at all for debugging
-        debug_query = text("SELECT COUNT(*) as total FROM parcelas WHERE activa = true")
-        debug_result = await db.execute(debug_query)
-        total_parcelas = debug_result.scalar()
-        logger.info(f"🔍 Total active parcelas in database: {total_parcelas}")
-        
-        debug_user_query = text("SELECT COUNT(*) as total FROM parcelas WHERE propietario_id = :user_id AND activa = true")
-        debug_user_result = await db.execute(debug_user_query, {"user_id": current_user["id"]})
-        user_parcelas = debug_user_result.scalar()
-        logger.info(f"🔍 Parcelas for user {current_user['id']}: {user_parcelas}")
-        
-        # Query with GeoJSON conversion
-        map_query = text("""
-            SELECT 
-                p.id,
-                p.nombre,
-                p.superficie,
-                p.tipo_cultivo,
-                p.cultivo,
-                p.variedad,
-                p.activa,
-                p.referencia_sigpac,
-                p.referencias_catastrales,
-                ST_AsGeoJSON(p.geometria) as geometria_geojson,
-                ST_X(p.centroide) as centroide_lng,
-                ST_Y(p.centroide) as centroide_lat,
-                p.created_at,
-                p.updated_at
-            FROM parcelas p
-            WHERE p.propietario_id = :user_id 
-            AND p.activa = true
-        """)
-        
-        result = await db.execute(map_query, {"user_id": current_user["id"]})
-        parcelas_raw = result.fetchall()
+        if zoom is not None and zoom <= settings.MAP_CLUSTER_MAX_ZOOM:
+            clusters = await get_map_clusters(
+                db, current_user["id"], zoom,
+                cultivos=cultivos, tipos_actividad=tipos_actividad, fecha_desde=fecha_desde,
+                fecha_hasta=fecha_hasta, solo_con_actividad=solo_con_actividad
+            )
+            if viewport:
+                min_lng, min_lat, max_lng, max_lat = viewport
+                clusters = [
+                    c for c in clusters
+                    if c["bbox"][0] <= max_lng and c["bbox"][2] >= min_lng
+                    and c["bbox"][1] <= max_lat and c["bbox"][3] >= min_lat
+                ]
+            
+            return {
+                "success": True,
+                "clustered": True,
+                "data": [],
+                "clusters": clusters,
+                "statistics": {
+                    "total_parcelas": sum(c["count"] for c in clusters),
+                    "total_superficie": round(sum(c["superficie"] for c in clusters), 2),
+                    "total_clusters": len(clusters)
+                }
+            }
         
-        logger.info(f"📊 Found {len(parcelas_raw)} parcelas for user {current_user['id']}")
+        result = await db.execute(MAP_DATA_BBOX_QUERY if viewport else MAP_DATA_QUERY, map_data_params(
+            current_user["id"], cultivos, tipos_actividad, fecha_desde, fecha_hasta, solo_con_actividad,
+            viewport, zoom
+        ))
         
-        # Build response data
+        # Build response data and statistics in a single pass
         parcelas_data = []
+        total_superficie = 0
+        cultivos_stats = {}
+        actividades_stats = {}
         
-        for row in parcelas_raw:
-            logger.info(f"🌾 Processing parcela: {row.nombre}")
+        for row in result:
+            superficie = row.superficie or 0
             
-            # Parse GeoJSON geometry
-            geometria_geojson = None
-            if row.geometria_geojson:
-                try:
-                    geometria_geojson = json.loads(row.geometria_geojson)
-                    logger.info(f"✅ GeoJSON parsed for {row.nombre}")
-                except Exception as e:
-                    logger.error(f"Error parsing GeoJSON for parcela {row.nombre}: {e}")
-            else:
-                logger.warning(f"⚠️ No geometry data for parcela {row.nombre}")
+            ultima_actividad = None
+            if row.actividad_id:
+                ultima_actividad = {
+                    'id': str(row.actividad_id),
+                    'tipo': row.actividad_tipo,
+                    'nombre': row.actividad_nombre,
+                    'fecha': row.actividad_fecha.isoformat() if row.actividad_fecha else None,
+                    'dias_desde': row.actividad_dias_desde,
+                    'estado': row.actividad_estado
+                }
+                actividades_stats[row.actividad_tipo] = actividades_stats.get(row.actividad_tipo, 0) + 1
             
-            # Build centroide coordinates
             centroide = None
             if row.centroide_lng is not None and row.centroide_lat is not None:
                 centroide = {
                     "lat": float(row.centroide_lat),
                     "lng": float(row.centroide_lng)
                 }
-                logger.info(f"📍 Centroide for {row.nombre}: {centroide}")
-            else:
-                logger.warning(f"⚠️ No centroide data for parcela {row.nombre}")
-            
-            # Get last activity for this parcela
-            activity_query = select(Actividad).where(
-                Actividad.parcela_id == row.id,
-                Actividad.usuario_id == current_user["id"]
-            ).order_by(Actividad.fecha.desc()).limit(1)
-            
-            # Apply activity filters
-            if tipos_actividad:
-                activity_query = activity_query.where(Actividad.tipo.in_(tipos_actividad))
             
-            if fecha_desde:
-                activity_query = activity_query.where(Actividad.fecha >= fecha_desde)
-                
-            if fecha_hasta:
-                activity_query = activity_query.where(Actividad.fecha <= fecha_hasta)
-            
-            activity_result = await db.execute(activity_query)
-            ultima_actividad = activity_result.scalar_one_or_none()
-            
-            # Skip parcela if solo_con_actividad is True and no activity found
-            if solo_con_actividad and not ultima_actividad:
-                continue
-            
-            # Build parcela data from row
-            parcela_dict = {
+            parcelas_data.append({
                 "id": str(row.id),
                 "nombre": row.nombre,
                 "superficie": row.superficie,
@@ -282,79 +627,123 @@ async def get_map_data(
                 "activa": row.activa,
                 "referencia_sigpac": row.referencia_sigpac,
                 "referencias_catastrales": row.referencias_catastrales,
-                "geometria_geojson": geometria_geojson,
+                "geometria_geojson": json.loads(row.geometria_geojson) if row.geometria_geojson else None,
                 "centroide": centroide,
                 "created_at": row.created_at.isoformat() if row.created_at else None,
-                "updated_at": row.updated_at.isoformat() if row.updated_at else None
-            }
+                "updated_at": row.updated_at.isoformat() if row.updated_at else None,
+                "ultima_actividad": ultima_actividad
+            })
             
-            if ultima_actividad:
-                if ultima_actividad.fecha:
-                    # Ensure both are date objects for proper subtraction
-                    fecha_actividad = ultima_actividad.fecha.date() if hasattr(ultima_actividad.fecha, 'date') else ultima_actividad.fecha
-                    dias_desde = (datetime.now().date() - fecha_actividad).days
-                else:
-                    dias_desde = None
-                parcela_dict.update({
-                    'ultima_actividad': {
-                        'id': str(ultima_actividad.id),
-                        'tipo': ultima_actividad.tipo.value,
-                        'nombre': ultima_actividad.nombre,
-                        'fecha': ultima_actividad.fecha.isoformat() if ultima_actividad.fecha else None,
-                        'dias_desde': dias_desde,
-                        'estado': ultima_actividad.estado.value if ultima_actividad.estado else None
-                    }
-                })
-            else:
-                parcela_dict['ultima_actividad'] = None
-            
-            parcelas_data.append(parcela_dict)
+            total_superficie += superficie
+            cultivo_stats = cultivos_stats.setdefault(row.tipo_cultivo, {'count': 0, 'superficie': 0})
+            cultivo_stats['count'] += 1
+            cultivo_stats['superficie'] += superficie
         
-        # Calculate statistics
-        total_parcelas = len(parcelas_data)
-        total_superficie = sum(p.get('superficie', 0) or 0 for p in parcelas_data)
-        
-        # Group by cultivo
-        cultivos_stats = {}
-        for parcela in parcelas_data:
-            cultivo = parcela.get('tipo_cultivo')
-            if cultivo not in cultivos_stats:
-                cultivos_stats[cultivo] = {'count': 0, 'superficie': 0}
-            cultivos_stats[cultivo]['count'] += 1
-            cultivos_stats[cultivo]['superficie'] += parcela.get('superficie', 0) or 0
-        
-        # Group by last activity type
-        actividades_stats = {}
-        for parcela in parcelas_data:
-            if parcela.get('ultima_actividad'):
-                tipo = parcela['ultima_actividad']['tipo']
-                if tipo not in actividades_stats:
-                    actividades_stats[tipo] = 0
-                actividades_stats[tipo] += 1
-        
-        response = {
+        return {
             "success": True,
             "data": parcelas_data,
             "statistics": {
-                "total_parcelas": total_parcelas,
+                "total_parcelas": len(parcelas_data),
                 "total_superficie": round(total_superficie, 2),
                 "por_cultivo": cultivos_stats,
                 "por_ultima_actividad": actividades_stats
             }
         }
         
-        logger.info(f"🚀 Returning response with {len(parcelas_data)} parcelas")
-        logger.info(f"📋 Response structure: {list(response.keys())}")
-        
-        return response
-        
     except Exception as e:
         logger.error(f"Error getting map data: {e}")
-        import traceback
-        logger.error(f"Traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail="Error retrieving map data")
 
 
+@router.get("/map-data/geojson")
+async def get_map_data_geojson(
+    cultivos: Optional[List[str]] = Query(None, description="Tipo de cultivo o nombre del cultivo"),
+    tipos_actividad: Optional[List[str]] = Query(None),
+    fecha_desde: Optional[date] = Query(None),
+    fecha_hasta: Optional[date] = Query(None),
+    solo_con_actividad: bool = Query(False),
+    bbox: Optional[str] = Query(None, description="Viewport: minLng,minLat,maxLng,maxLat"),
+    zoom: Optional[int] = Query(None, ge=0, le=24, description="Map zoom; selects a simplified geometry"),
+    db: AsyncSession = Depends(get_read_session),
+    current_user: dict = Depends(get_current_user)
+):
+    """Stream map data as a GeoJSON FeatureCollection built by PostGIS"""
+    
+    viewport = parse_bbox(bbox)
+    
+    try:
+        # Server-side cursor: rows arrive in batches instead of all at once
+        result = await db.stream(
+            MAP_FEATURES_BBOX_QUERY if viewport else MAP_FEATURES_QUERY,
+            map_data_params(
+                current_user["id"], cultivos, tipos_actividad, fecha_desde, fecha_hasta, solo_con_actividad,
+                viewport, zoom
+            ),
+            execution_options={"yield_per": 500}
+        )
+    except Exception as e:
+        logger.error(f"Error getting map data GeoJSON: {e}")
+        raise HTTPException(status_code=500, detail="Error retrieving map data")
+    
+    async def feature_collection():
+        buffer = bytearray(b'{"type":"FeatureCollection","features":[')
+        separator = b""
+        try:
+            async for (feature,) in result:
+                buffer += separator
+                buffer += feature.encode()
+                separator = b","
+                if len(buffer) >= MAP_FEATURES_CHUNK_SIZE:
+                    yield bytes(buffer)
+                    buffer.clear()
+        finally:
+            await result.close()
+        
+        buffer += b"]}"
+        yield bytes(buffer)
+    
+    return StreamingResponse(feature_collection(), media_type="application/geo+json")
+
+
+@router.get("/tiles/{z}/{x}/{y}.mvt")
+async def get_parcelas_tile(
+    z: int,
+    x: int,
+    y: int,
+    organizacion_id: Optional[str] = Query(None),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_session),
+    current_user: dict = Depends(get_current_user)
+):
+    """Get a Mapbox Vector Tile with the user's parcelas"""
+    
+    if not 0 <= z <= 24 or not 0 <= x < 2 ** z or not 0 <= y < 2 ** z:
+        raise HTTPException(status_code=400, detail="Invalid tile coordinates")
+    
+    user_id = current_user["id"]
+    cache_key = (organizacion_id, z, x, y)
+    
+    tile = tile_cache.get(user_id, cache_key)
+    if tile is not None:
+        return _tile_response(tile, if_none_match, "HIT")
+    
+    try:
+        generation = tile_cache.generation(user_id)
+        result = await db.execute(TILE_QUERY, {
+            "z": z, "x": x, "y": y,
+            "user_id": user_id,
+            "organizacion_id": organizacion_id
+        })
+        tile = bytes(result.scalar() or b"")
+        tile_cache.put(user_id, cache_key, tile, generation)
+        
+        return _tile_response(tile, if_none_match, "MISS")
+        
+    except Exception as e:
+        logger.error(f"Error building tile {z}/{x}/{y}: {e}")
+        raise HTTPException(status_code=500, detail="Error building tile")
+
+
 @router.get("/{parcela_id}")
 async def get_parcela(
     parcela_id: UUID,
@@ -449,6 +838,8 @@ async def create_parcela(
         db.add(parcela)
         logger.info(f"Parcela added to session")
         await db.commit()
+        tile_cache.invalidate_user(current_user["id"])
+        location_index.invalidate_user(current_user["id"])
         logger.info(f"Database commit successful")
         await db.refresh(parcela)
         logger.info(f"Parcela refreshed")
@@ -502,6 +893,8 @@ async def update_parcela(
                     setattr(parcela, field, value)
         
         await db.commit()
+        tile_cache.invalidate_user(current_user["id"])
+        location_index.invalidate_user(current_user["id"])
         await db.refresh(parcela)
         
         logger.info(f"Updated parcela {parcela_id} for user {current_user['id']}")
@@ -544,6 +937,8 @@ async def delete_parcela(
         # Soft delete
         parcela.activa = False
         await db.commit()
+        tile_cache.invalidate_user(current_user["id"])
+        location_index.invalidate_user(current_user["id"])
         
         logger.info(f"Deleted parcela {parcela_id} for user {current_user['id']}")
         
@@ -584,16 +979,11 @@ async def calculate_superficie(
         if not parcela.geometria:
             raise HTTPException(status_code=400, detail="Parcela has no geometry")
         
-        # Calculate area using PostGIS
-        from sqlalchemy import text
-        area_query = text("""
-            SELECT ST_Area(ST_Transform(geometria, 3857)) / 10000 as area_hectares
-            FROM parcelas 
-            WHERE id = :parcela_id
-        """)
-        
-        area_result = await db.execute(area_query, {"parcela_id": parcela_id})
-        area_hectares = area_result.scalar()
+        # Stored when the geometry was written; PostGIS only for rows not yet recomputed
+        area_hectares = parcela.superficie_calculada
+        if area_hectares is None:
+            area_result = await db.execute(SUPERFICIE_QUERY, {"parcela_id": parcela_id})
+            area_hectares = area_result.scalar()
         
         return {
             "success": True,
@@ -632,41 +1022,22 @@ async def find_parcela_by_location(
         if not (-90 <= lat <= 90) or not (-180 <= lng <= 180):
             raise HTTPException(status_code=400, detail="Invalid GPS coordinates")
         
-        # Use PostGIS to find parcela containing the point
-        from sqlalchemy import text
-        
-        query = text("""
-            SELECT 
-                id,
-                nombre,
-                superficie,
-                tipo_cultivo,
-                cultivo,
-                ST_Distance(
-                    ST_Transform(geometria, 3857),
-                    ST_Transform(ST_SetSRID(ST_MakePoint(:lng, :lat), 4326), 3857)
-                ) as distance_meters,
-                ST_Contains(geometria, ST_SetSRID(ST_MakePoint(:lng, :lat), 4326)) as within_parcela
-            FROM parcelas 
-            WHERE propietario_id = :user_id 
-                AND activa = true
-                AND geometria IS NOT NULL
-            ORDER BY 
-                ST_Contains(geometria, ST_SetSRID(ST_MakePoint(:lng, :lat), 4326)) DESC,
-                ST_Distance(
-                    ST_Transform(geometria, 3857),
-                    ST_Transform(ST_SetSRID(ST_MakePoint(:lng, :lat), 4326), 3857)
-                ) ASC
-            LIMIT 5
-        """)
-        
-        result = await db.execute(query, {
-            "lat": lat,
-            "lng": lng,
-            "user_id": current_user["id"]
-        })
-        
-        parcelas_found = result.fetchall()
+        # In-memory R-tree when enabled, PostGIS otherwise (or if the user's index is too large)
+        parcelas_found = None
+        if settings.LOCATION_INDEX_ENABLED:
+            try:
+                parcelas_found = await location_index.find(db, current_user["id"], lat, lng)
+            except Exception as e:
+                logger.warning(f"Location index unavailable, using PostGIS: {e}")
+        
+        if parcelas_found is None:
+            result = await db.execute(FIND_BY_LOCATION_QUERY, {
+                "lat": lat,
+                "lng": lng,
+                "user_id": current_user["id"],
+                "candidates": FIND_BY_LOCATION_CANDIDATES
+            })
+            parcelas_found = result.fetchall()
         
         if not parcelas_found:
             return {
@@ -718,4 +1089,69 @@ async def find_parcela_by_location(
         raise
     except Exception as e:
         logger.error(f"Error finding parcela by location: {e}")
+        raise HTTPException(status_code=500, detail="Error processing location data")
+
+
+@router.post("/locate-batch")
+async def locate_batch(
+    batch_data: dict,
+    db: AsyncSession = Depends(get_read_session),
+    current_user: dict = Depends(get_current_user)
+):
+    """Resolve a GPS log to parcelas and return the time intervals spent in each"""
+    
+    try:
+        lats = [float(v) for v in batch_data.get('latitudes') or []]
+        lngs = [float(v) for v in batch_data.get('longitudes') or []]
+        timestamps = [_parse_gps_timestamp(v) for v in batch_data.get('timestamps') or []]
+        tolerance = float(batch_data.get('tolerance_meters', settings.LOCATE_BATCH_TOLERANCE_METERS))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid coordinate or timestamp format")
+    
+    if not lats or not len(lats) == len(lngs) == len(timestamps):
+        raise HTTPException(status_code=400, detail="latitudes, longitudes and timestamps must be non-empty arrays of the same length")
+    if len(lats) > settings.LOCATE_BATCH_MAX_POINTS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.LOCATE_BATCH_MAX_POINTS} points per batch")
+    if not all(-90 <= lat <= 90 for lat in lats) or not all(-180 <= lng <= 180 for lng in lngs):
+        raise HTTPException(status_code=400, detail="Invalid GPS coordinates")
+    if not 0 <= tolerance <= 1000:
+        raise HTTPException(status_code=400, detail="tolerance_meters must be between 0 and 1000")
+    
+    try:
+        result = await db.execute(LOCATE_BATCH_QUERY, {
+            "lats": lats,
+            "lngs": lngs,
+            "timestamps": timestamps,
+            "tolerance": tolerance,
+            "user_id": current_user["id"]
+        })
+        
+        intervals = []
+        assigned = 0
+        for row in result:
+            if row.parcela_id:
+                assigned += row.puntos
+            intervals.append({
+                "parcela_id": str(row.parcela_id) if row.parcela_id else None,
+                "nombre": row.nombre,
+                "start": row.inicio.isoformat(),
+                "end": row.fin.isoformat(),
+                "duration_seconds": (row.fin - row.inicio).total_seconds(),
+                "points": row.puntos,
+                "points_inside": row.puntos_dentro
+            })
+        
+        return {
+            "success": True,
+            "data": {
+                "intervals": intervals,
+                "points": len(lats),
+                "assigned_points": assigned,
+                "unassigned_points": len(lats) - assigned,
+                "tolerance_meters": tolerance
+            }
+        }
+        
+    except Exception as e:
+        logger.error(f"Error locating GPS batch: {e}")
         raise HTTPException(status_code=500, detail="Error processing location data")
\ No newline at end of file
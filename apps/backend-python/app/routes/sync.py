@@ -2,20 +2,27 @@
 Sync routes - Offline synchronization for mobile apps
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_
 from datetime import datetime
 from loguru import logger
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
-from app.database.connection import get_async_session
+from app.database.connection import get_async_session, get_read_session
 from app.models.parcela import Parcela
 from app.models.actividad import Actividad
+from app.models.dto import ParcelaDTO, ActividadDTO, Projection, fetch_dicts, parse_fields, projection
 from app.middleware.auth import get_current_user
+from app.services.map_cache import tile_cache
+from app.services.location_index import location_index
 
 router = APIRouter()
 
+# Clients merge pulled rows by id and compare updated_at with their own copy
+SYNC_REQUIRED_FIELDS = ("id", "updated_at")
+
 
 @router.post("/")
 async def sync_data(
@@ -59,8 +66,14 @@ async def sync_data(
         
         await db.commit()
         
+        if "parcelas" in sync_payload or "actividades" in sync_payload:
+            tile_cache.invalidate_user(user_id)
+        if "parcelas" in sync_payload:
+            location_index.invalidate_user(user_id)
+        
         logger.info(f"Sync completed for user {user_id}")
-        return results
+        # updated_data holds orjson fragments, so skip FastAPI's jsonable_encoder
+        return ORJSONResponse(results)
         
     except Exception as e:
         await db.rollback()
@@ -78,11 +91,19 @@ async def sync_data(
 @router.get("/pull")
 async def pull_server_changes(
     last_sync: str = None,
-    db: AsyncSession = Depends(get_async_session),
+    parcela_fields: Optional[str] = Query(None, description="Comma-separated parcela columns; id and updated_at are always included"),
+    actividad_fields: Optional[str] = Query(None, description="Comma-separated actividad columns; id and updated_at are always included"),
+    db: AsyncSession = Depends(get_read_session),
     current_user: dict = Depends(get_current_user)
 ):
     """Pull server changes since last sync"""
     
+    try:
+        parcelas_projected = projection(ParcelaDTO, parse_fields(ParcelaDTO, parcela_fields, required=SYNC_REQUIRED_FIELDS))
+        actividades_projected = projection(ActividadDTO, parse_fields(ActividadDTO, actividad_fields, required=SYNC_REQUIRED_FIELDS))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     try:
         user_id = current_user["id"]
         
@@ -95,9 +116,11 @@ async def pull_server_changes(
                 logger.warning(f"Invalid last_sync format: {last_sync}")
         
         # Get updated data
-        updated_data = await get_updated_data_since(db, user_id, last_sync_dt)
+        updated_data = await get_updated_data_since(
+            db, user_id, last_sync_dt, parcelas_projected, actividades_projected
+        )
         
-        return {
+        return ORJSONResponse({
             "success": True,
             "data": {
                 "parcelas": updated_data["parcelas"],
@@ -105,7 +128,7 @@ async def pull_server_changes(
                 "server_timestamp": datetime.utcnow().isoformat(),
                 "last_sync": last_sync
             }
-        }
+        })
         
     except Exception as e:
         logger.error(f"Pull error for user {user_id}: {e}")
@@ -294,32 +317,38 @@ async def sync_actividades(db: AsyncSession, user_id: str, actividades_data: Lis
     return result
 
 
-async def get_updated_data_since(db: AsyncSession, user_id: str, last_sync: datetime = None) -> Dict:
-    """Get data updated since last sync"""
+async def get_updated_data_since(
+    db: AsyncSession,
+    user_id: str,
+    last_sync: datetime = None,
+    parcelas_projected: Projection = None,
+    actividades_projected: Projection = None
+) -> Dict:
+    """Get data updated since last sync, optionally restricted to some columns"""
+    parcelas_projected = parcelas_projected or projection(ParcelaDTO)
+    actividades_projected = actividades_projected or projection(ActividadDTO)
     
     if not last_sync:
         # If no last sync, return all data
         last_sync = datetime.min
     
     # Get updated parcelas
-    parcelas_query = select(Parcela).where(
+    parcelas_query = select(*parcelas_projected.columns).where(
         and_(
             Parcela.propietario_id == user_id,
             Parcela.updated_at > last_sync
         )
     )
-    parcelas_result = await db.execute(parcelas_query)
-    parcelas = [parcela.to_dict() for parcela in parcelas_result.scalars()]
+    parcelas = await fetch_dicts(db, parcelas_projected, parcelas_query)
     
     # Get updated actividades
-    actividades_query = select(Actividad).where(
+    actividades_query = select(*actividades_projected.columns).where(
         and_(
             Actividad.usuario_id == user_id,
             Actividad.updated_at > last_sync
         )
     )
-    actividades_result = await db.execute(actividades_query)
-    actividades = [actividad.to_dict() for actividad in actividades_result.scalars()]
+    actividades = await fetch_dicts(db, actividades_projected, actividades_query)
     
     return {
         "parcelas": parcelas,
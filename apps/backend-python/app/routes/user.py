@@ -8,7 +8,7 @@ from sqlalchemy import select, func, text
 from loguru import logger
 from datetime import datetime, timedelta
 
-from app.database.connection import get_async_session
+from app.database.connection import get_async_session, get_read_session
 from app.models.parcela import Parcela
 from app.models.actividad import Actividad
 from app.middleware.auth import get_current_user
@@ -36,7 +36,7 @@ async def get_user_profile(current_user: dict = Depends(get_current_user)):
 
 @router.get("/stats")
 async def get_user_stats(
-    db: AsyncSession = Depends(get_async_session),
+    db: AsyncSession = Depends(get_read_session),
     current_user: dict = Depends(get_current_user)
 ):
     """Get user statistics dashboard"""
@@ -121,7 +121,7 @@ async def get_user_stats(
 
 @router.get("/dashboard")
 async def get_dashboard_data(
-    db: AsyncSession = Depends(get_async_session),
+    db: AsyncSession = Depends(get_read_session),
     current_user: dict = Depends(get_current_user)
 ):
     """Get comprehensive dashboard data"""
@@ -0,0 +1,224 @@
+"""
+Location index - per-user in-memory R-tree of parcela polygons for find-by-location
+
+Needs shapely (and numpy); without them every lookup is answered by PostGIS.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional
+
+from starlette.concurrency import run_in_threadpool
+from loguru import logger
+
+from app.config.settings import settings
+from app.database.prepared_statements import prepared_statements
+
+try:
+    import numpy as np
+    import shapely
+    SHAPELY_AVAILABLE = True
+except ImportError:
+    SHAPELY_AVAILABLE = False
+    logger.warning("shapely not available. find-by-location will always query PostGIS.")
+
+LOCATION_INDEX_QUERY = prepared_statements.register("parcelas_location_index", """
+    SELECT id, nombre, superficie, tipo_cultivo, cultivo, ST_AsBinary(geometria) AS wkb
+    FROM parcelas
+    WHERE propietario_id = :user_id
+        AND activa = true
+        AND geometria IS NOT NULL
+""")
+
+EARTH_RADIUS_M = 6_371_008.8
+
+# Candidates ranked by metric distance, as in FIND_BY_LOCATION_QUERY
+NEAREST_CANDIDATES = 20
+SEARCH_RADIUS_DEG = 0.01
+
+# Rough per-parcela overhead besides coordinates (GEOS object, row tuple, tree node)
+PARCELA_OVERHEAD_BYTES = 600
+
+
+class LocationMatch(NamedTuple):
+    """Same fields as a FIND_BY_LOCATION_QUERY row"""
+    id: object
+    nombre: str
+    superficie: float
+    tipo_cultivo: str
+    cultivo: str
+    distance_meters: float
+    within_parcela: bool
+
+
+def _haversine_m(lng1, lat1, lng2, lat2):
+    lng1, lat1, lng2, lat2 = map(np.radians, (lng1, lat1, lng2, lat2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+class UserLocationIndex:
+    """STRtree over one user's prepared parcela polygons"""
+    
+    __slots__ = ("rows", "geometries", "tree", "size_bytes", "expires_at")
+    
+    def __init__(self, rows: list, ttl_seconds: float):
+        self.rows = [row[:5] for row in rows]
+        self.geometries = shapely.from_wkb([bytes(row[5]) for row in rows]) if rows else np.empty(0, dtype=object)
+        shapely.prepare(self.geometries)
+        self.tree = shapely.STRtree(self.geometries)
+        self.size_bytes = int(shapely.get_num_coordinates(self.geometries).sum()) * 16 + len(rows) * PARCELA_OVERHEAD_BYTES
+        self.expires_at = time.monotonic() + ttl_seconds
+    
+    def search(self, lng: float, lat: float, limit: int = 5) -> List[LocationMatch]:
+        """Containing parcelas first, then nearest by distance in metres"""
+        if not self.rows:
+            return []
+        
+        point = shapely.Point(lng, lat)
+        inside = set(self.tree.query(point, predicate="intersects").tolist())
+        
+        # Grow a search box until it holds enough candidates to rank
+        wanted = min(NEAREST_CANDIDATES, len(self.rows))
+        radius = SEARCH_RADIUS_DEG
+        while True:
+            candidates = self.tree.query(shapely.box(lng - radius, lat - radius, lng + radius, lat + radius))
+            if len(candidates) >= wanted or radius >= 360:
+                break
+            radius *= 4
+        
+        nearest = shapely.get_coordinates(shapely.shortest_line(self.geometries[candidates], point))[::2]
+        distances = _haversine_m(nearest[:, 0], nearest[:, 1], lng, lat)
+        
+        ranked = sorted(
+            zip(candidates.tolist(), distances.tolist()),
+            key=lambda item: (item[0] not in inside, item[1])
+        )
+        return [
+            LocationMatch(*self.rows[i], 0.0 if i in inside else distance, i in inside)
+            for i, distance in ranked[:limit]
+        ]
+
+
+class LocationIndexCache:
+    """LRU of per-user location indexes, bounded by estimated memory and a TTL
+
+    Uses the same generation scheme as the tile cache: an index built while a
+    write to the user's parcelas committed is not stored. Users whose index
+    would not fit in the budget are answered by PostGIS until their next write.
+    
+    An index is built once per miss: concurrent lookups for the same user
+    wait for the build in progress and then re-check the cache, and the
+    geometry parsing and tree building run in the threadpool.
+    """
+    
+    def __init__(self, max_bytes: int, ttl_seconds: float):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.size_bytes = 0
+        self._indexes: "OrderedDict[str, UserLocationIndex]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._oversized: set = set()
+        self._builds: Dict[str, asyncio.Future] = {}
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0, "oversized": 0}
+    
+    def generation(self, user_id: str) -> int:
+        return self._generations.get(user_id, 0)
+    
+    def get(self, user_id: str) -> Optional[UserLocationIndex]:
+        index = self._indexes.get(user_id)
+        if index is None or index.expires_at < time.monotonic():
+            if index is not None:
+                self._remove(user_id)
+            return None
+        
+        self._indexes.move_to_end(user_id)
+        return index
+    
+    def put(self, user_id: str, index: UserLocationIndex, generation: int):
+        if generation != self.generation(user_id):
+            return
+        if index.size_bytes > self.max_bytes:
+            self._oversized.add(user_id)
+            self.stats["oversized"] += 1
+            return
+        
+        self._remove(user_id)
+        self._indexes[user_id] = index
+        self.size_bytes += index.size_bytes
+        
+        while self.size_bytes > self.max_bytes:
+            self._remove(next(iter(self._indexes)))
+    
+    async def find(self, db, user_id: str, lat: float, lng: float, limit: int = 5) -> Optional[List[LocationMatch]]:
+        """Matches for a point, building the user's index if needed; None means ask PostGIS"""
+        if not SHAPELY_AVAILABLE:
+            return None
+        
+        while True:
+            if user_id in self._oversized:
+                return None
+            
+            index = self.get(user_id)
+            if index is not None:
+                self.stats["hits"] += 1
+                break
+            
+            building = self._builds.get(user_id)
+            if building is None:
+                self.stats["misses"] += 1
+                index = await self._build(db, user_id)
+                break
+            # Shielded so a cancelled waiter does not cancel the shared build
+            await asyncio.shield(building)
+        
+        return index.search(lng, lat, limit)
+    
+    async def _build(self, db, user_id: str) -> UserLocationIndex:
+        building = asyncio.get_running_loop().create_future()
+        self._builds[user_id] = building
+        try:
+            generation = self.generation(user_id)
+            result = await db.execute(LOCATION_INDEX_QUERY, {"user_id": user_id})
+            index = await run_in_threadpool(UserLocationIndex, result.all(), self.ttl_seconds)
+            self.put(user_id, index, generation)
+            return index
+        finally:
+            # Waiters re-check the cache, and build again if this one failed
+            # or was not stored
+            del self._builds[user_id]
+            building.set_result(None)
+    
+    def invalidate_user(self, user_id: str):
+        """Drop the user's index (call after committing a parcela write)"""
+        self._generations[user_id] = self.generation(user_id) + 1
+        self._oversized.discard(user_id)
+        self._remove(user_id)
+        self.stats["invalidations"] += 1
+    
+    def clear(self):
+        self._indexes.clear()
+        self._oversized.clear()
+        self.size_bytes = 0
+    
+    def _remove(self, user_id: str):
+        index = self._indexes.pop(user_id, None)
+        if index is not None:
+            self.size_bytes -= index.size_bytes
+    
+    def info(self) -> dict:
+        return {
+            "enabled": settings.LOCATION_INDEX_ENABLED,
+            "available": SHAPELY_AVAILABLE,
+            "users": len(self._indexes),
+            "size_bytes": self.size_bytes,
+            "max_bytes": self.max_bytes,
+            **self.stats
+        }
+
+
+location_index = LocationIndexCache(
+    max_bytes=settings.LOCATION_INDEX_MAX_MB * 1024 * 1024,
+    ttl_seconds=settings.LOCATION_INDEX_TTL_SECONDS
+)
\ No newline at end of file
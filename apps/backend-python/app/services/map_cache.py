@@ -0,0 +1,86 @@
+"""
+Map tile cache - rendered vector tiles and clusters per user, invalidated on parcela/actividad writes
+"""
+
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+from app.config.settings import settings
+
+
+class TileCache:
+    """LRU of tile bytes keyed per user, bounded by total size and a TTL
+
+    Each user has a generation number that every write bumps. A tile is only
+    stored if the user's generation did not change while it was rendered, so
+    a render that raced with a write never repopulates the cache with stale
+    data. The cache is per process; the TTL bounds how long another worker
+    can keep serving a tile after a write it did not see.
+    """
+    
+    def __init__(self, max_bytes: int, ttl_seconds: float):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.size_bytes = 0
+        self._tiles: "OrderedDict[Tuple[str, Hashable], Tuple[float, bytes]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+    
+    def generation(self, user_id: str) -> int:
+        return self._generations.get(user_id, 0)
+    
+    def get(self, user_id: str, key: Hashable) -> Optional[bytes]:
+        entry = self._tiles.get((user_id, key))
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                self._remove((user_id, key))
+            self.stats["misses"] += 1
+            return None
+        
+        self._tiles.move_to_end((user_id, key))
+        self.stats["hits"] += 1
+        return entry[1]
+    
+    def put(self, user_id: str, key: Hashable, tile: bytes, generation: int):
+        """Store a tile rendered while the user was at ``generation``"""
+        if generation != self.generation(user_id) or len(tile) > self.max_bytes:
+            return
+        
+        self._remove((user_id, key))
+        self._tiles[(user_id, key)] = (time.monotonic() + self.ttl_seconds, tile)
+        self.size_bytes += len(tile)
+        
+        while self.size_bytes > self.max_bytes:
+            oldest = next(iter(self._tiles))
+            self._remove(oldest)
+    
+    def invalidate_user(self, user_id: str):
+        """Drop every tile of ``user_id`` (call after committing a write)"""
+        self._generations[user_id] = self.generation(user_id) + 1
+        for cache_key in [k for k in self._tiles if k[0] == user_id]:
+            self._remove(cache_key)
+        self.stats["invalidations"] += 1
+    
+    def clear(self):
+        self._tiles.clear()
+        self.size_bytes = 0
+    
+    def _remove(self, cache_key):
+        entry = self._tiles.pop(cache_key, None)
+        if entry is not None:
+            self.size_bytes -= len(entry[1])
+    
+    def info(self) -> dict:
+        return {
+            "tiles": len(self._tiles),
+            "size_bytes": self.size_bytes,
+            "max_bytes": self.max_bytes,
+            **self.stats
+        }
+
+
+tile_cache = TileCache(
+    max_bytes=settings.MAP_TILE_CACHE_MAX_MB * 1024 * 1024,
+    ttl_seconds=settings.MAP_TILE_CACHE_TTL_SECONDS
+)
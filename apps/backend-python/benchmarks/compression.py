@@ -0,0 +1,80 @@
+"""
+Benchmark: response compression, size and CPU per encoding and level
+
+    python -m benchmarks.compression [--iterations 20]
+
+Needs no database: bodies are the serialized synthetic rows of
+benchmarks.serialization (a 100-row parcelas page and 20k-row parcelas and
+actividades sync pulls). For each body it reports the compressed size and
+the time to compress with gzip and brotli at a few levels, plus the cost of
+a CompressionCache hit (digest + lookup), which is what repeated tile and
+map-data responses pay instead.
+"""
+
+import argparse
+import gzip
+import sys
+
+from fastapi.responses import ORJSONResponse
+
+from app.config.settings import settings
+from app.middleware import compression
+from app.models.dto import ActividadDTO, ParcelaDTO
+
+from benchmarks.dataset import print_table
+from benchmarks.serialization import _actividad_row, _parcela_row, _timed
+
+GZIP_LEVELS = (1, 6, 9)
+BROTLI_QUALITIES = (1, 5, 9)
+
+
+def _body(dto_class, make_row, size: int) -> bytes:
+    rows = [dto_class.serialize(make_row(i)) for i in range(size)]
+    return ORJSONResponse({"success": True, "data": rows}).body
+
+
+def _cases(body: bytes) -> dict:
+    """case -> compress function"""
+    cases = {f"gzip level {level}": (lambda level=level: gzip.compress(body, level, mtime=0)) for level in GZIP_LEVELS}
+    if compression.BROTLI_AVAILABLE:
+        for quality in BROTLI_QUALITIES:
+            cases[f"brotli quality {quality}"] = lambda quality=quality: compression.brotli.compress(body, quality=quality)
+    return cases
+
+
+def run(iterations: int) -> bool:
+    if not compression.BROTLI_AVAILABLE:
+        print("brotli is not installed; only gzip is measured")
+    
+    bodies = {
+        "parcelas page (100 rows)": _body(ParcelaDTO, _parcela_row, 100),
+        "parcelas sync pull (20k rows)": _body(ParcelaDTO, _parcela_row, 20_000),
+        "actividades sync pull (20k rows)": _body(ActividadDTO, _actividad_row, 20_000),
+    }
+    
+    ok = True
+    for name, body in bodies.items():
+        calls = iterations if len(body) < 1024 * 1024 else max(3, iterations // 5)
+        cases = _cases(body)
+        print_table(f"{name}: {len(body) / 1024:.0f} KiB", {case: _timed(fn, calls) for case, fn in cases.items()})
+        for case, fn in cases.items():
+            size = len(fn())
+            print(f"{'  ' + case + ' size (KiB) / ratio':<40}{size / 1024:>10.1f}{len(body) / size:>10.1f}")
+        
+        cache = compression.CompressionCache(max_bytes=settings.COMPRESSION_CACHE_MAX_MB * 1024 * 1024, ttl_seconds=60)
+        encoding = "br" if compression.BROTLI_AVAILABLE else "gzip"
+        cache.put((encoding, compression._digest(body)), compression.compress(body, encoding))
+        hit = lambda: cache.get((encoding, compression._digest(body)))
+        if hit() is None:
+            ok = False
+            print(f"MISS ({name}): cached body not found")
+        print_table(f"{name}: cached ({encoding} at the configured level)", {"digest + cache hit": _timed(hit, calls)})
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=20)
+    options = parser.parse_args()
+    
+    sys.exit(0 if run(options.iterations) else 1)
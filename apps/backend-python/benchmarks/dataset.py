@@ -0,0 +1,131 @@
+"""
+Synthetic benchmark dataset - parcelas and actividades for a throwaway user
+
+Parcelas are ~1 ha squares laid out on a grid over the Spanish mainland, so
+spatial queries see a realistic SRID 4326 spread. Everything is keyed by a
+dedicated ``propietario_id``/``usuario_id`` and removed by ``drop_dataset``.
+"""
+
+import time
+from statistics import mean, median, quantiles
+
+import asyncpg
+
+from app.config.settings import settings
+
+BENCH_USER_ID = "user_benchmark"
+
+# Bounding box the grid is spread over (lng/lat, roughly mainland Spain)
+GRID_ORIGIN = (-7.0, 37.5)
+GRID_COLUMNS = 200
+GRID_STEP = 0.02  # degrees between parcel origins
+PARCELA_SIZE = 0.0012  # degrees, ~1 ha at these latitudes
+
+
+async def connect(**kwargs) -> asyncpg.Connection:
+    """Plain asyncpg connection to the configured database"""
+    return await asyncpg.connect(settings.DATABASE_URL, **kwargs)
+
+
+async def seed_dataset(
+    conn: asyncpg.Connection,
+    parcelas: int = 10_000,
+    actividades_por_parcela: int = 0,
+    user_id: str = BENCH_USER_ID
+):
+    """Insert ``parcelas`` grid parcels (and optional activities) for ``user_id``"""
+    await drop_dataset(conn, user_id)
+    
+    await conn.execute("""
+        INSERT INTO parcelas (
+            id, nombre, superficie, tipo_cultivo, cultivo, propietario_id,
+            activa, geometria, centroide, created_at, updated_at
+        )
+        SELECT
+            gen_random_uuid(),
+            'Parcela ' || g,
+            1.0,
+            (enum_range(NULL::tipocultivo))[1 + g % 11],
+            'Cultivo ' || (g % 7),
+            $1,
+            true,
+            ST_MakeEnvelope(x, y, x + $5::float8, y + $5::float8, 4326),
+            ST_SetSRID(ST_MakePoint(x + $5::float8 / 2, y + $5::float8 / 2), 4326),
+            now() - (g || ' minutes')::interval,
+            now() - (g || ' minutes')::interval
+        FROM generate_series(0, $2::int - 1) AS g,
+             LATERAL (
+                 SELECT $3::float8 + (g % $6::int) * $4::float8 AS x,
+                        $7::float8 + (g / $6::int) * $4::float8 AS y
+             ) AS origin
+    """, user_id, parcelas, GRID_ORIGIN[0], GRID_STEP, PARCELA_SIZE, GRID_COLUMNS, GRID_ORIGIN[1])
+    
+    if actividades_por_parcela:
+        await conn.execute("""
+            INSERT INTO actividades (
+                id, tipo, nombre, parcela_id, usuario_id, fecha, estado,
+                costo_total, duracion_horas, created_at, updated_at
+            )
+            SELECT
+                gen_random_uuid(),
+                (enum_range(NULL::tipoactividad))[1 + n % 9],
+                'Actividad ' || n,
+                p.id,
+                $1,
+                now() - (n || ' days')::interval,
+                'COMPLETADA'::estadoactividad,
+                50 + n,
+                2,
+                now() - (n || ' days')::interval,
+                now() - (n || ' days')::interval
+            FROM parcelas p, generate_series(1, $2::int) AS n
+            WHERE p.propietario_id = $1
+        """, user_id, actividades_por_parcela)
+    
+    await conn.execute("ANALYZE parcelas")
+    await conn.execute("ANALYZE actividades")
+
+
+async def drop_dataset(conn: asyncpg.Connection, user_id: str = BENCH_USER_ID):
+    """Remove everything seeded for ``user_id``"""
+    await conn.execute("DELETE FROM actividades WHERE usuario_id = $1", user_id)
+    await conn.execute("DELETE FROM parcelas WHERE propietario_id = $1", user_id)
+
+
+def grid_point(index: int, inside: bool = True) -> tuple:
+    """(lng, lat) inside parcel ``index`` or halfway to the next grid column"""
+    x = GRID_ORIGIN[0] + (index % GRID_COLUMNS) * GRID_STEP
+    y = GRID_ORIGIN[1] + (index // GRID_COLUMNS) * GRID_STEP
+    offset = PARCELA_SIZE / 2 if inside else GRID_STEP / 2
+    return x + offset, y + PARCELA_SIZE / 2
+
+
+async def timed(fn, iterations: int, warmup: int = 5) -> dict:
+    """Run ``await fn()`` repeatedly and summarise per-call latency in ms"""
+    for _ in range(warmup):
+        await fn()
+    
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    
+    return summarize(samples)
+
+
+def summarize(samples: list) -> dict:
+    cuts = quantiles(samples, n=20) if len(samples) > 1 else samples * 19
+    return {
+        "mean_ms": round(mean(samples), 3),
+        "p50_ms": round(median(samples), 3),
+        "p95_ms": round(cuts[18], 3),
+        "calls": len(samples)
+    }
+
+
+def print_table(title: str, rows: dict):
+    print(f"\n{title}")
+    print(f"{'case':<40}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for name, stats in rows.items():
+        print(f"{name:<40}{stats['mean_ms']:>10}{stats['p50_ms']:>10}{stats['p95_ms']:>10}")
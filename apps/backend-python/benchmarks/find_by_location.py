@@ -0,0 +1,109 @@
+"""
+Benchmark: POST /parcelas/find-by-location, full sort vs GIST KNN
+
+    python -m benchmarks.find_by_location [--parcelas 10000] [--noise-parcelas 10000] [--iterations 200]
+
+Seeds ``--parcelas`` parcelas for the benchmark user (and ``--noise-parcelas``
+for a second user on the same grid) and times, for a point inside a parcela
+and one between parcelas:
+
+* full sort - the previous query: ST_Transform to 3857 twice per row over all
+              of the user's parcelas, then a sort of the whole set
+* KNN       - the current query: index-ordered <-> candidates, geography
+              distances on the candidates only
+
+Both queries must agree on the containing parcela.
+"""
+
+import argparse
+import asyncio
+import sys
+
+from sqlalchemy.dialects.postgresql.asyncpg import dialect as asyncpg_dialect
+
+from app.database.prepared_statements import prepared_statements
+from app.routes.parcelas import FIND_BY_LOCATION_CANDIDATES
+
+from benchmarks.dataset import (
+    BENCH_USER_ID, connect, drop_dataset, grid_point, print_table, seed_dataset, timed
+)
+
+NOISE_USER_ID = "user_benchmark_noise"
+
+FULL_SORT_QUERY = """
+    SELECT
+        id,
+        nombre,
+        superficie,
+        tipo_cultivo,
+        cultivo,
+        ST_Distance(
+            ST_Transform(geometria, 3857),
+            ST_Transform(ST_SetSRID(ST_MakePoint($1, $2), 4326), 3857)
+        ) as distance_meters,
+        ST_Contains(geometria, ST_SetSRID(ST_MakePoint($1, $2), 4326)) as within_parcela
+    FROM parcelas
+    WHERE propietario_id = $3
+        AND activa = true
+        AND geometria IS NOT NULL
+    ORDER BY
+        ST_Contains(geometria, ST_SetSRID(ST_MakePoint($1, $2), 4326)) DESC,
+        ST_Distance(
+            ST_Transform(geometria, 3857),
+            ST_Transform(ST_SetSRID(ST_MakePoint($1, $2), 4326), 3857)
+        ) ASC
+    LIMIT 5
+"""
+
+
+def _render_knn(lng: float, lat: float):
+    compiled = prepared_statements["parcelas_find_by_location"].compile(dialect=asyncpg_dialect())
+    params = {"lng": lng, "lat": lat, "user_id": BENCH_USER_ID, "candidates": FIND_BY_LOCATION_CANDIDATES}
+    return str(compiled), [params[key] for key in compiled.positiontup]
+
+
+async def run(parcelas: int, noise_parcelas: int, iterations: int) -> bool:
+    conn = await connect()
+    try:
+        print(f"Seeding {parcelas} parcelas for {BENCH_USER_ID} and {noise_parcelas} for {NOISE_USER_ID}...")
+        await seed_dataset(conn, parcelas=noise_parcelas, user_id=NOISE_USER_ID)
+        await seed_dataset(conn, parcelas=parcelas)
+        
+        full_sort = await conn.prepare(FULL_SORT_QUERY)
+        ok = True
+        
+        for label, inside in (("point inside a parcela", True), ("point between parcelas", False)):
+            lng, lat = grid_point(parcelas // 2, inside=inside)
+            knn_sql, knn_args = _render_knn(lng, lat)
+            knn = await conn.prepare(knn_sql)
+            
+            before = await full_sort.fetch(lng, lat, BENCH_USER_ID)
+            after = await knn.fetch(*knn_args)
+            found_before = [row["id"] for row in before if row["within_parcela"]][:1]
+            found_after = [row["id"] for row in after if row["within_parcela"]][:1]
+            if found_before != found_after:
+                ok = False
+                print(f"MISMATCH ({label}): full sort found {found_before}, KNN found {found_after}")
+            
+            rows = {
+                "full sort": await timed(lambda: full_sort.fetch(lng, lat, BENCH_USER_ID), iterations),
+                "KNN": await timed(lambda: knn.fetch(*knn_args), iterations),
+            }
+            print_table(f"{label} ({parcelas} parcelas)", rows)
+            print(f"{'nearest distance (m) full sort / KNN':<40}"
+                  f"{before[0]['distance_meters']:>10.1f}{after[0]['distance_meters']:>10.1f}")
+        return ok
+    finally:
+        await drop_dataset(conn)
+        await drop_dataset(conn, NOISE_USER_ID)
+        await conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--parcelas", type=int, default=10_000)
+    parser.add_argument("--noise-parcelas", type=int, default=10_000)
+    parser.add_argument("--iterations", type=int, default=200)
+    options = parser.parse_args()
+    
+    sys.exit(0 if asyncio.run(run(options.parcelas, options.noise_parcelas, options.iterations)) else 1)
@@ -0,0 +1,173 @@
+"""
+Plan check: the hot read queries must use the indexes from migrations/
+
+    python -m benchmarks.plan_check [--parcelas 500] [--noise-parcelas 20000]
+
+Seeds a small dataset for the benchmark user next to a larger one for a
+second user (so per-user filters are selective, as in production), runs
+EXPLAIN for the queries the list, map and stats endpoints issue, and fails
+with exit code 1 when a plan does not touch one of the expected indexes.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql.asyncpg import dialect as asyncpg_dialect
+
+from app.database.pagination import after_cursor
+from app.database.prepared_statements import prepared_statements
+from app.models.actividad import Actividad
+from app.models.parcela import Parcela
+from app.routes.parcelas import FIND_BY_LOCATION_CANDIDATES, map_data_params
+
+from benchmarks.dataset import (
+    BENCH_USER_ID, GRID_ORIGIN, GRID_STEP, connect, drop_dataset, grid_point, seed_dataset
+)
+
+NOISE_USER_ID = "user_benchmark_noise"
+
+PARCELAS_BY_OWNER = {
+    "idx_parcelas_activas_propietario_created",
+    "idx_parcelas_propietario_activa_created",
+}
+
+PARCELAS_BY_GEOMETRY = {
+    "idx_parcelas_activas_geometria",
+    "idx_parcelas_geometria",
+}
+
+
+def _render(statement, params: dict = None):
+    """Positional SQL and arguments as the asyncpg dialect sends them"""
+    compiled = statement.compile(dialect=asyncpg_dialect())
+    values = {**compiled.params, **(params or {})}
+    return str(compiled), [values[key] for key in compiled.positiontup]
+
+
+def _index_names(plan_node: dict) -> set:
+    names = set()
+    if "Index Name" in plan_node:
+        names.add(plan_node["Index Name"])
+    for child in plan_node.get("Plans", ()):
+        names |= _index_names(child)
+    return names
+
+
+async def _plan_indexes(conn, sql: str, args: list) -> set:
+    """Indexes used by the plan; partition indexes are reported as their parent index"""
+    plan = await conn.fetchval(f"EXPLAIN (FORMAT JSON) {sql}", *args)
+    names = _index_names(json.loads(plan)[0]["Plan"])
+    rows = await conn.fetch("""
+        SELECT COALESCE(parent.relname, c.relname) AS name
+        FROM pg_class c
+        LEFT JOIN pg_inherits i ON i.inhrelid = c.oid
+        LEFT JOIN pg_class parent ON parent.oid = i.inhparent
+        WHERE c.relname = ANY($1::text[])
+    """, list(names))
+    return {row["name"] for row in rows} | names
+
+
+def _cases() -> dict:
+    """name -> (statement, params, acceptable indexes)"""
+    since = datetime.utcnow() - timedelta(days=30)
+    # A 5x5 cell viewport in the corner of the grid both users share
+    viewport = (GRID_ORIGIN[0], GRID_ORIGIN[1], GRID_ORIGIN[0] + 5 * GRID_STEP, GRID_ORIGIN[1] + 5 * GRID_STEP)
+    lng, lat = grid_point(42, inside=False)
+    return {
+        "GET /parcelas": (
+            select(Parcela)
+            .where(Parcela.propietario_id == BENCH_USER_ID, Parcela.activa == True)
+            .offset(0).limit(10).order_by(Parcela.created_at.desc()),
+            None,
+            PARCELAS_BY_OWNER
+        ),
+        "GET /parcelas/map-data": (
+            prepared_statements["parcelas_map_data"],
+            map_data_params(BENCH_USER_ID),
+            PARCELAS_BY_OWNER
+        ),
+        "map-data latest activity": (
+            prepared_statements["parcelas_map_data"],
+            map_data_params(BENCH_USER_ID),
+            {"idx_actividades_parcela_fecha"}
+        ),
+        "map-data bbox": (
+            prepared_statements["parcelas_map_data_bbox"],
+            map_data_params(BENCH_USER_ID, bbox=viewport, zoom=10),
+            PARCELAS_BY_GEOMETRY
+        ),
+        "find-by-location KNN": (
+            prepared_statements["parcelas_find_by_location"],
+            {"user_id": BENCH_USER_ID, "lat": lat, "lng": lng, "candidates": FIND_BY_LOCATION_CANDIDATES},
+            {"idx_parcelas_activas_propietario_geometria"} | PARCELAS_BY_GEOMETRY
+        ),
+        "GET /actividades": (
+            select(Actividad)
+            .where(Actividad.usuario_id == BENCH_USER_ID)
+            .offset(0).limit(10).order_by(Actividad.fecha.desc()),
+            None,
+            {"idx_actividades_usuario_fecha_tipo"}
+        ),
+        "GET /parcelas?cursor=": (
+            after_cursor(
+                select(Parcela).where(Parcela.propietario_id == BENCH_USER_ID, Parcela.activa == True),
+                Parcela.created_at, Parcela.id, (since, uuid.UUID(int=0))
+            ).limit(11).order_by(Parcela.created_at.desc(), Parcela.id.desc()),
+            None,
+            {"idx_parcelas_activas_propietario_created_id"}
+        ),
+        "GET /actividades?cursor=": (
+            after_cursor(
+                select(Actividad).where(Actividad.usuario_id == BENCH_USER_ID),
+                Actividad.fecha, Actividad.id, (since, uuid.UUID(int=0))
+            ).limit(11).order_by(Actividad.fecha.desc(), Actividad.id.desc()),
+            None,
+            {"idx_actividades_usuario_fecha_id"}
+        ),
+        "GET /actividades/stats": (
+            select(Actividad.tipo, func.count(Actividad.id))
+            .where(Actividad.usuario_id == BENCH_USER_ID, Actividad.fecha >= since)
+            .group_by(Actividad.tipo),
+            None,
+            {"idx_actividades_usuario_fecha_tipo"}
+        ),
+    }
+
+
+async def run(parcelas: int, noise_parcelas: int) -> bool:
+    conn = await connect()
+    try:
+        print(f"Seeding {parcelas} parcelas for {BENCH_USER_ID} and {noise_parcelas} for {NOISE_USER_ID}...")
+        await seed_dataset(conn, parcelas=noise_parcelas, actividades_por_parcela=3, user_id=NOISE_USER_ID)
+        await seed_dataset(conn, parcelas=parcelas, actividades_por_parcela=3)
+        
+        ok = True
+        print(f"\n{'query':<28}{'result':<8}indexes used")
+        for name, (statement, params, expected) in _cases().items():
+            sql, args = _render(statement, params)
+            used = await _plan_indexes(conn, sql, args)
+            passed = bool(used & expected)
+            ok = ok and passed
+            
+            print(f"{name:<28}{'PASS' if passed else 'FAIL':<8}{', '.join(sorted(used)) or '(none)'}")
+            if not passed:
+                print(f"{'':<36}expected one of: {', '.join(sorted(expected))}")
+        return ok
+    finally:
+        await drop_dataset(conn)
+        await drop_dataset(conn, NOISE_USER_ID)
+        await conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--parcelas", type=int, default=500)
+    parser.add_argument("--noise-parcelas", type=int, default=20_000)
+    options = parser.parse_args()
+    
+    sys.exit(0 if asyncio.run(run(options.parcelas, options.noise_parcelas)) else 1)
@@ -0,0 +1,99 @@
+"""
+Benchmark: planning time saved by the prepared-statement registry
+
+    python -m benchmarks.prepared_statements [--parcelas 10000] [--iterations 200]
+
+Seeds ``--parcelas`` parcelas for a throwaway user and, for every query in
+``app.database.prepared_statements``, compares per-call latency of:
+
+* unprepared        - no statement cache, every call is parsed and planned
+                      (what the routes did before the registry)
+* prepared          - statement prepared once and re-executed; Postgres may
+                      switch to a cached generic plan after 5 executions
+* prepared, generic - same, with ``plan_cache_mode = force_generic_plan``
+
+The server-side ``Planning Time`` reported by EXPLAIN (ANALYZE, SUMMARY) is
+printed as the per-call planning cost the prepared paths avoid.
+"""
+
+import argparse
+import asyncio
+import json
+
+from sqlalchemy.dialects.postgresql.asyncpg import dialect as asyncpg_dialect
+
+from app.database.prepared_statements import prepared_statements
+from app.routes.parcelas import FIND_BY_LOCATION_CANDIDATES, map_data_params
+
+from benchmarks.dataset import (
+    BENCH_USER_ID, connect, drop_dataset, grid_point, print_table, seed_dataset, timed
+)
+
+
+def _render(name: str, params: dict):
+    """Positional SQL and argument list exactly as the asyncpg dialect sends them"""
+    compiled = prepared_statements[name].compile(dialect=asyncpg_dialect())
+    return str(compiled), [params[key] for key in compiled.positiontup]
+
+
+async def _planning_time(conn, sql: str, args: list) -> float:
+    plan = await conn.fetchval(f"EXPLAIN (ANALYZE, SUMMARY, FORMAT JSON) {sql}", *args)
+    return json.loads(plan)[0]["Planning Time"]
+
+
+async def run(parcelas: int, iterations: int):
+    setup = await connect()
+    try:
+        print(f"Seeding {parcelas} parcelas for {BENCH_USER_ID}...")
+        await seed_dataset(setup, parcelas=parcelas)
+        parcela_id = await setup.fetchval(
+            "SELECT id FROM parcelas WHERE propietario_id = $1 LIMIT 1", BENCH_USER_ID
+        )
+        
+        lng, lat = grid_point(parcelas // 2)
+        cases = {
+            "parcelas_map_data": map_data_params(BENCH_USER_ID),
+            "parcelas_find_by_location": {
+                "user_id": BENCH_USER_ID, "lat": lat, "lng": lng, "candidates": FIND_BY_LOCATION_CANDIDATES
+            },
+            "parcelas_superficie": {"parcela_id": parcela_id},
+        }
+        
+        unprepared = await connect(statement_cache_size=0)
+        prepared = await connect()
+        generic = await connect(server_settings={"plan_cache_mode": "force_generic_plan"})
+        
+        for name, params in cases.items():
+            if name not in prepared_statements.names():
+                continue
+            
+            sql, args = _render(name, params)
+            planning_ms = await _planning_time(setup, sql, args)
+            
+            prepared_stmt = await prepared.prepare(sql)
+            generic_stmt = await generic.prepare(sql)
+            
+            rows = {
+                "unprepared": await timed(lambda: unprepared.fetch(sql, *args), iterations),
+                "prepared": await timed(lambda: prepared_stmt.fetch(*args), iterations),
+                "prepared, generic plan": await timed(lambda: generic_stmt.fetch(*args), iterations),
+            }
+            print_table(f"{name} (server planning time {planning_ms:.3f} ms/call)", rows)
+            
+            saved = rows["unprepared"]["mean_ms"] - rows["prepared, generic plan"]["mean_ms"]
+            print(f"{'saved per call':<40}{saved:>10.3f}")
+        
+        for conn in (unprepared, prepared, generic):
+            await conn.close()
+    finally:
+        await drop_dataset(setup)
+        await setup.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--parcelas", type=int, default=10_000)
+    parser.add_argument("--iterations", type=int, default=200)
+    options = parser.parse_args()
+    
+    asyncio.run(run(options.parcelas, options.iterations))
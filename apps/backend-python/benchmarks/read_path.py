@@ -0,0 +1,116 @@
+"""
+Benchmark: ORM entities + to_dict() vs projected __slots__ DTOs
+
+    python -m benchmarks.read_path [--parcelas 10000] [--actividades-por-parcela 5]
+
+Seeds ``--parcelas`` parcelas with ``--actividades-por-parcela`` activities
+each (50k activities by default) and compares both read paths on:
+
+* a 100-row page of parcelas and of actividades (GET /parcelas, /actividades)
+* a full sync pull of every actividad (get_updated_data_since)
+
+Latency is measured per call; allocations are the tracemalloc peak of a
+single call, i.e. the extra memory a worker needs to serve it.
+"""
+
+import argparse
+import asyncio
+import tracemalloc
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.config.settings import settings
+from app.models.actividad import Actividad
+from app.models.dto import ActividadDTO, ParcelaDTO, fetch_dicts
+from app.models.parcela import Parcela
+
+from benchmarks.dataset import BENCH_USER_ID, connect, drop_dataset, print_table, seed_dataset, timed
+
+SYNC_SINCE = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+
+def _queries(page_size: int) -> dict:
+    """case -> (ORM query, DTO class, projected query)"""
+    parcela_filters = (Parcela.propietario_id == BENCH_USER_ID, Parcela.activa == True)
+    actividad_filters = (Actividad.usuario_id == BENCH_USER_ID,)
+    sync_filters = (Actividad.usuario_id == BENCH_USER_ID, Actividad.updated_at > SYNC_SINCE)
+    
+    return {
+        f"parcelas page ({page_size})": (
+            select(Parcela).where(*parcela_filters).order_by(Parcela.created_at.desc()).limit(page_size),
+            ParcelaDTO,
+            select(*ParcelaDTO.columns).where(*parcela_filters).order_by(Parcela.created_at.desc()).limit(page_size)
+        ),
+        f"actividades page ({page_size})": (
+            select(Actividad).where(*actividad_filters).order_by(Actividad.fecha.desc()).limit(page_size),
+            ActividadDTO,
+            select(*ActividadDTO.columns).where(*actividad_filters).order_by(Actividad.fecha.desc()).limit(page_size)
+        ),
+        "sync pull (all actividades)": (
+            select(Actividad).where(*sync_filters),
+            ActividadDTO,
+            select(*ActividadDTO.columns).where(*sync_filters)
+        ),
+    }
+
+
+async def _orm_read(session_factory, query) -> list:
+    async with session_factory() as session:
+        result = await session.execute(query)
+        return [entity.to_dict() for entity in result.scalars()]
+
+
+async def _dto_read(session_factory, dto_class, query) -> list:
+    async with session_factory() as session:
+        return await fetch_dicts(session, dto_class, query)
+
+
+async def _peak_allocation_mb(fn) -> float:
+    tracemalloc.start()
+    try:
+        await fn()
+        return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    finally:
+        tracemalloc.stop()
+
+
+async def run(parcelas: int, actividades_por_parcela: int, iterations: int):
+    setup = await connect()
+    engine = create_async_engine(settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://"))
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    
+    try:
+        print(f"Seeding {parcelas} parcelas x {actividades_por_parcela} actividades for {BENCH_USER_ID}...")
+        await seed_dataset(setup, parcelas=parcelas, actividades_por_parcela=actividades_por_parcela)
+        
+        for name, (orm_query, dto_class, dto_query) in _queries(page_size=100).items():
+            orm = lambda: _orm_read(session_factory, orm_query)
+            dto = lambda: _dto_read(session_factory, dto_class, dto_query)
+            
+            rows = len(await dto())
+            calls = iterations if rows <= 1000 else max(3, iterations // 50)
+            results = {
+                "ORM + to_dict()": await timed(orm, calls),
+                "projected DTO": await timed(dto, calls),
+            }
+            print_table(f"{name}: {rows} rows", results)
+            
+            orm_mb = await _peak_allocation_mb(orm)
+            dto_mb = await _peak_allocation_mb(dto)
+            print(f"{'peak allocation ORM / DTO (MiB)':<40}{orm_mb:>10.2f}{dto_mb:>10.2f}")
+    finally:
+        await engine.dispose()
+        await drop_dataset(setup)
+        await setup.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--parcelas", type=int, default=10_000)
+    parser.add_argument("--actividades-por-parcela", type=int, default=5)
+    parser.add_argument("--iterations", type=int, default=200)
+    options = parser.parse_args()
+    
+    asyncio.run(run(options.parcelas, options.actividades_por_parcela, options.iterations))
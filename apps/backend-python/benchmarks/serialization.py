@@ -0,0 +1,122 @@
+"""
+Benchmark: response serialization, DTO.to_dict() + JSONResponse vs generated serializers + orjson
+
+    python -m benchmarks.serialization [--iterations 50]
+
+Needs no database: rows are synthetic tuples shaped like the DTO projections
+(GeoJSON text from PostGIS, UUIDs, enums, timezone-aware datetimes, JSONB
+dicts). For a 100-row page and a 20k-row sync pull of parcelas and of
+actividades it times everything after the query returns:
+
+* previous path - ``DTO(row).to_dict()`` per row (GeoJSON parsed with
+                  json.loads), FastAPI's jsonable_encoder, JSONResponse.render
+* current path  - ``DTO.serialize(row)`` per row (GeoJSON embedded as an
+                  orjson fragment), ORJSONResponse.render
+
+Both bodies must decode to the same document.
+"""
+
+import argparse
+import json
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from app.models.actividad import EstadoActividad, TipoActividad
+from app.models.dto import ActividadDTO, ParcelaDTO
+from app.models.parcela import TipoCultivo
+
+from benchmarks.dataset import BENCH_USER_ID, PARCELA_SIZE, grid_point, print_table, summarize
+
+SIZES = (100, 20_000)
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _polygon(i: int) -> str:
+    lng, lat = grid_point(i)
+    lng, lat = lng - PARCELA_SIZE / 2, lat - PARCELA_SIZE / 2
+    ring = [[lng, lat], [lng + PARCELA_SIZE, lat], [lng + PARCELA_SIZE, lat + PARCELA_SIZE], [lng, lat + PARCELA_SIZE], [lng, lat]]
+    return json.dumps({"type": "Polygon", "coordinates": [ring]})
+
+
+def _parcela_row(i: int) -> tuple:
+    lng, lat = grid_point(i)
+    moment = START + timedelta(minutes=i)
+    return (
+        uuid.uuid4(), f"Parcela {i}", 1.0, 0.998, TipoCultivo.OLIVAR, "olivo", "picual",
+        f"14:900:0:0:{i}:1", _polygon(i), json.dumps({"type": "Point", "coordinates": [lng, lat]}),
+        _polygon(i), 5, uuid.uuid4().hex, BENCH_USER_ID, None, True, None,
+        {"riego": "goteo", "marco": [7, 7]}, moment, moment
+    )
+
+
+def _actividad_row(i: int) -> tuple:
+    lng, lat = grid_point(i, inside=True)
+    moment = START + timedelta(minutes=i)
+    return (
+        uuid.uuid4(), TipoActividad.TRATAMIENTO, f"Tratamiento {i}", "Aplicación foliar",
+        uuid.uuid4(), BENCH_USER_ID, None, moment, 2.5, EstadoActividad.COMPLETADA,
+        json.dumps({"type": "Point", "coordinates": [lng, lat]}), 1.0,
+        [{"nombre": "Cobre", "dosis": 2.0, "unidad": "kg/ha"}], {"tractor": "T-1"},
+        40.0, 25.5, 30.0, 95.5, {"temperatura": 18, "viento": 2.1}, None, [], None, None,
+        moment, moment
+    )
+
+
+def _previous(dto_class, rows: list) -> bytes:
+    content = {"success": True, "data": [dto_class(row).to_dict() for row in rows]}
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def _current(dto_class, rows: list) -> bytes:
+    serialize = dto_class.serialize
+    return ORJSONResponse({"success": True, "data": [serialize(row) for row in rows]}).body
+
+
+def _timed(fn, iterations: int, warmup: int = 2) -> dict:
+    for _ in range(warmup):
+        fn()
+    
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    
+    return summarize(samples)
+
+
+def run(iterations: int) -> bool:
+    ok = True
+    for name, dto_class, make_row in (
+        ("parcelas", ParcelaDTO, _parcela_row),
+        ("actividades", ActividadDTO, _actividad_row),
+    ):
+        for size in SIZES:
+            rows = [make_row(i) for i in range(size)]
+            previous = _previous(dto_class, rows)
+            current = _current(dto_class, rows)
+            if json.loads(previous) != json.loads(current):
+                ok = False
+                print(f"MISMATCH ({name}, {size} rows): bodies decode differently")
+            
+            calls = iterations if size <= 1000 else max(3, iterations // 10)
+            results = {
+                "to_dict + JSONResponse": _timed(lambda: _previous(dto_class, rows), calls),
+                "serializer + ORJSONResponse": _timed(lambda: _current(dto_class, rows), calls),
+            }
+            print_table(f"{name}: {size} rows", results)
+            print(f"{'body size previous / current (KiB)':<40}{len(previous) / 1024:>10.1f}{len(current) / 1024:>10.1f}")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=50)
+    options = parser.parse_args()
+    
+    sys.exit(0 if run(options.iterations) else 1)
@@ -3,6 +3,7 @@ Initialize database with tables
 """
 import asyncio
 from app.database import connection
+from app.database.migrations import run_migrations
 from app.models.parcela import Parcela
 from app.models.actividad import Actividad
 from loguru import logger
@@ -21,6 +22,14 @@ async def init_database():
             
         logger.success("Database tables created successfully!")
         
+        logger.info("Applying migrations...")
+        applied = await run_migrations()
+        logger.success(f"{len(applied)} migrations applied")
+        
+        partitions = await connection.maintain_partitions()
+        if partitions.get("created"):
+            logger.success(f"Partitions created: {', '.join(partitions['created'])}")
+        
     except Exception as e:
         logger.error(f"Error creating database tables: {e}")
         raise
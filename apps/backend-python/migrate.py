@@ -0,0 +1,45 @@
+"""
+Apply versioned SQL migrations from migrations/
+
+    python migrate.py            # apply all pending migrations
+    python migrate.py --status   # list migrations and whether they are applied
+    python migrate.py --to 0001  # apply pending migrations up to a version
+
+Applying migrations also runs actividades partition maintenance once, so a
+deploy has the current and upcoming partitions before any worker starts.
+"""
+import argparse
+import asyncio
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.config.settings import settings
+from app.database.migrations import migration_status, run_migrations
+from app.database.partitions import maintain_actividades_partitions
+from loguru import logger
+
+async def main(status: bool, target: str):
+    """Run or report migrations"""
+    if status:
+        for migration in await migration_status():
+            mark = "x" if migration["applied"] else " "
+            print(f"[{mark}] {migration['version']}_{migration['name']}")
+        return
+    
+    applied = await run_migrations(target=target)
+    if applied:
+        logger.success(f"Applied migrations: {', '.join(applied)}")
+    else:
+        logger.info("Database is up to date")
+    
+    engine = create_async_engine(settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://"))
+    try:
+        await maintain_actividades_partitions(engine)
+    finally:
+        await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply versioned SQL migrations")
+    parser.add_argument("--status", action="store_true")
+    parser.add_argument("--to", dest="target", default=None)
+    options = parser.parse_args()
+    
+    asyncio.run(main(options.status, options.target))
\ No newline at end of file
@@ -0,0 +1,32 @@
+-- migrate: no-transaction
+-- Phase 4 indexes (docs/DATABASE_OPTIMIZATION_PHASE4.md), built without
+-- blocking writes. Index names match the ones geoalchemy2 gives the spatial
+-- indexes in create_all, so fresh databases skip them.
+
+-- Spatial indexes for map and location queries
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_parcelas_geometria
+    ON parcelas USING GIST (geometria);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_parcelas_centroide
+    ON parcelas USING GIST (centroide);
+
+-- Parcelas list: owner + active flag, newest first
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_parcelas_propietario_activa_created
+    ON parcelas (propietario_id, activa, created_at DESC);
+
+-- Actividades timeline and stats per user
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_actividades_usuario_fecha_tipo
+    ON actividades (usuario_id, fecha DESC, tipo);
+
+-- Last activity per parcela (map data)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_actividades_parcela_fecha
+    ON actividades (parcela_id, fecha DESC);
+
+-- Partial indexes: almost every read filters on activa = true
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_parcelas_activas_propietario_created
+    ON parcelas (propietario_id, created_at DESC)
+    WHERE activa = true;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_parcelas_activas_geometria
+    ON parcelas USING GIST (geometria)
+    WHERE activa = true;
@@ -0,0 +1,73 @@
+-- Range-partition actividades by fecha.
+--
+-- Existing rows are copied into a DEFAULT partition; the partition
+-- maintenance job (app/database/partitions.py) then moves them into yearly
+-- or per-campaign partitions. The primary key becomes (id, fecha) because a
+-- partitioned table's unique constraints must include the partition key.
+-- Foreign keys, triggers and indexes of the old table are recreated on the
+-- parent, which propagates them to every partition.
+--
+-- Runs in one transaction and rewrites the table: schedule it in a
+-- maintenance window on large databases.
+
+DO $$
+DECLARE
+    r record;
+    index_defs text[] := '{}';
+    index_def text;
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'actividades'::regclass) THEN
+        RETURN;
+    END IF;
+
+    ALTER TABLE actividades RENAME TO actividades_unpartitioned;
+
+    CREATE TABLE actividades (
+        LIKE actividades_unpartitioned
+        INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE INCLUDING COMMENTS
+    ) PARTITION BY RANGE (fecha);
+
+    ALTER TABLE actividades_unpartitioned DROP CONSTRAINT IF EXISTS actividades_pkey;
+    ALTER TABLE actividades ADD CONSTRAINT actividades_pkey PRIMARY KEY (id, fecha);
+
+    FOR r IN
+        SELECT conname, pg_get_constraintdef(oid) AS def
+        FROM pg_constraint
+        WHERE conrelid = 'actividades_unpartitioned'::regclass AND contype = 'f'
+    LOOP
+        EXECUTE format('ALTER TABLE actividades_unpartitioned DROP CONSTRAINT %I', r.conname);
+        EXECUTE format('ALTER TABLE actividades ADD CONSTRAINT %I %s', r.conname, r.def);
+    END LOOP;
+
+    FOR r IN
+        SELECT tgname, pg_get_triggerdef(oid) AS def
+        FROM pg_trigger
+        WHERE tgrelid = 'actividades_unpartitioned'::regclass AND NOT tgisinternal
+    LOOP
+        EXECUTE format('DROP TRIGGER %I ON actividades_unpartitioned', r.tgname);
+        EXECUTE regexp_replace(r.def, ' ON (\S+\.)?actividades_unpartitioned ', ' ON actividades ');
+    END LOOP;
+
+    -- Unique indexes cannot be kept without fecha; everything else is rebuilt
+    FOR r IN
+        SELECT i.indexrelid::regclass::text AS name, pg_get_indexdef(i.indexrelid) AS def
+        FROM pg_index i
+        WHERE i.indrelid = 'actividades_unpartitioned'::regclass AND NOT i.indisunique
+    LOOP
+        index_defs := index_defs || regexp_replace(r.def, ' ON (\S+\.)?actividades_unpartitioned ', ' ON actividades ');
+        EXECUTE format('DROP INDEX %s', r.name);
+    END LOOP;
+
+    -- Rows without a date cannot be routed to a partition
+    UPDATE actividades_unpartitioned SET fecha = COALESCE(created_at, now()) WHERE fecha IS NULL;
+
+    CREATE TABLE actividades_default PARTITION OF actividades DEFAULT;
+    INSERT INTO actividades SELECT * FROM actividades_unpartitioned;
+    DROP TABLE actividades_unpartitioned;
+
+    FOREACH index_def IN ARRAY index_defs LOOP
+        EXECUTE index_def;
+    END LOOP;
+END
+$$;
+
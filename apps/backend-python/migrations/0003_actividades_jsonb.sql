@@ -0,0 +1,34 @@
+-- JSONB storage for the actividades JSON columns, plus GIN indexes for the
+-- containment filters on GET /actividades (producto, registro_sanitario,
+-- maquina).
+--
+-- Databases built from migrate_actividades_schema.sql already use JSONB;
+-- those built by create_all got plain JSON and are converted here.
+--
+-- CREATE INDEX CONCURRENTLY is not available on partitioned tables, so the
+-- GIN indexes are built in this transaction and block writes while they build.
+
+DO $$
+DECLARE
+    col text;
+BEGIN
+    FOR col IN
+        SELECT column_name
+        FROM information_schema.columns
+        WHERE table_name = 'actividades'
+          AND data_type = 'json'
+          AND column_name IN (
+              'productos', 'maquinaria', 'condiciones_meteorologicas',
+              'documentos_ocr', 'imagenes', 'configuracion'
+          )
+    LOOP
+        EXECUTE format('ALTER TABLE actividades ALTER COLUMN %I TYPE jsonb USING %I::jsonb', col, col);
+    END LOOP;
+END
+$$;
+
+CREATE INDEX IF NOT EXISTS idx_actividades_productos_gin
+    ON actividades USING GIN (productos jsonb_path_ops);
+
+CREATE INDEX IF NOT EXISTS idx_actividades_maquinaria_gin
+    ON actividades USING GIN (maquinaria jsonb_path_ops);
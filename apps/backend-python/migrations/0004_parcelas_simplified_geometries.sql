@@ -0,0 +1,61 @@
+-- Simplified copies of parcelas.geometria for low-zoom map requests.
+--
+-- Each column is ST_SimplifyPreserveTopology at roughly half a 256px web
+-- mercator pixel for its zoom (in degrees), so it renders the same as the
+-- full SIGPAC polygon at that zoom and below:
+--
+--   geometria_z10  tolerance 0.0007     zoom <= 10
+--   geometria_z13  tolerance 0.00009    zoom 11-13
+--   geometria_z16  tolerance 0.00001    zoom 14-16
+--
+-- Above zoom 16 GET /parcelas/map-data returns the original geometry. The
+-- copies are written by a trigger whenever geometria changes, so the ORM
+-- model does not map them.
+
+ALTER TABLE parcelas
+    ADD COLUMN IF NOT EXISTS geometria_z10 geometry(Geometry, 4326),
+    ADD COLUMN IF NOT EXISTS geometria_z13 geometry(Geometry, 4326),
+    ADD COLUMN IF NOT EXISTS geometria_z16 geometry(Geometry, 4326);
+
+CREATE OR REPLACE FUNCTION parcelas_simplify_geometria() RETURNS trigger AS $$
+BEGIN
+    IF NEW.geometria IS NULL THEN
+        NEW.geometria_z10 := NULL;
+        NEW.geometria_z13 := NULL;
+        NEW.geometria_z16 := NULL;
+    ELSE
+        NEW.geometria_z10 := ST_SimplifyPreserveTopology(NEW.geometria, 0.0007);
+        NEW.geometria_z13 := ST_SimplifyPreserveTopology(NEW.geometria, 0.00009);
+        NEW.geometria_z16 := ST_SimplifyPreserveTopology(NEW.geometria, 0.00001);
+    END IF;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS parcelas_simplify_geometria ON parcelas;
+CREATE TRIGGER parcelas_simplify_geometria
+    BEFORE INSERT OR UPDATE OF geometria ON parcelas
+    FOR EACH ROW EXECUTE FUNCTION parcelas_simplify_geometria();
+
+-- Backfill existing rows without bumping updated_at (sync clients would
+-- otherwise pull every parcela again)
+DO $$
+DECLARE
+    has_updated_at_trigger boolean;
+BEGIN
+    SELECT EXISTS (
+        SELECT 1 FROM pg_trigger
+        WHERE tgrelid = 'parcelas'::regclass AND tgname = 'update_parcelas_updated_at'
+    ) INTO has_updated_at_trigger;
+    
+    IF has_updated_at_trigger THEN
+        ALTER TABLE parcelas DISABLE TRIGGER update_parcelas_updated_at;
+    END IF;
+    
+    UPDATE parcelas SET geometria = geometria WHERE geometria IS NOT NULL;
+    
+    IF has_updated_at_trigger THEN
+        ALTER TABLE parcelas ENABLE TRIGGER update_parcelas_updated_at;
+    END IF;
+END
+$$;
@@ -0,0 +1,14 @@
+-- migrate: no-transaction
+-- Per-owner spatial index for nearest-parcela (KNN) searches.
+--
+-- POST /parcelas/find-by-location orders a user's parcelas by
+-- geometria <-> point. With geometria alone in the GIST index, the scan walks
+-- outward through every user's parcelas and discards the ones that belong to
+-- someone else. Putting propietario_id in the same GIST index (btree_gist)
+-- lets the scan visit only that user's parcelas, nearest first.
+
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_parcelas_activas_propietario_geometria
+    ON parcelas USING GIST (propietario_id, geometria)
+    WHERE activa = true;
@@ -0,0 +1,24 @@
+-- Geodesic area of each parcela, stored when its geometry is written.
+--
+-- The previous on-request ST_Area(ST_Transform(geometria, 3857)) measured in
+-- Web Mercator, which inflates areas by about 1/cos²(lat) (~60-75% in
+-- Spain). ST_Area on geography measures on the spheroid, in m².
+--
+-- Existing rows are filled by the batched job, without holding a long
+-- transaction here:
+--
+--   python recompute_parcelas.py [--user ID | --organizacion ID]
+
+ALTER TABLE parcelas ADD COLUMN IF NOT EXISTS superficie_calculada double precision;
+
+CREATE OR REPLACE FUNCTION parcelas_calcular_superficie() RETURNS trigger AS $$
+BEGIN
+    NEW.superficie_calculada := ST_Area(NEW.geometria::geography) / 10000;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS parcelas_calcular_superficie ON parcelas;
+CREATE TRIGGER parcelas_calcular_superficie
+    BEFORE INSERT OR UPDATE OF geometria ON parcelas
+    FOR EACH ROW EXECUTE FUNCTION parcelas_calcular_superficie();
@@ -0,0 +1,46 @@
+-- Columns derived from parcelas.geometria, maintained on write so read
+-- endpoints never compute geometry on the fly:
+--
+--   centroide            ST_PointOnSurface (always inside the parcela, unlike
+--                        ST_Centroid for L- or C-shaped plots); kept as sent
+--                        by the client when there is no geometry
+--   bbox                 ST_Envelope
+--   num_vertices         ST_NPoints
+--   geometria_hash       md5 of the EWKB, lets clients skip unchanged geometries
+--   superficie_calculada geodesic area in hectares (migrations/0006)
+--
+-- One trigger replaces the area-only trigger from 0006. Existing rows are
+-- filled by the batched job:
+--
+--   python recompute_parcelas.py [--user ID | --organizacion ID]
+
+ALTER TABLE parcelas
+    ADD COLUMN IF NOT EXISTS bbox geometry(Geometry, 4326),
+    ADD COLUMN IF NOT EXISTS num_vertices integer,
+    ADD COLUMN IF NOT EXISTS geometria_hash varchar(32);
+
+CREATE OR REPLACE FUNCTION parcelas_derivar_geometria() RETURNS trigger AS $$
+BEGIN
+    IF NEW.geometria IS NULL THEN
+        NEW.superficie_calculada := NULL;
+        NEW.bbox := NULL;
+        NEW.num_vertices := NULL;
+        NEW.geometria_hash := NULL;
+    ELSE
+        NEW.superficie_calculada := ST_Area(NEW.geometria::geography) / 10000;
+        NEW.centroide := ST_PointOnSurface(NEW.geometria);
+        NEW.bbox := ST_Envelope(NEW.geometria);
+        NEW.num_vertices := ST_NPoints(NEW.geometria);
+        NEW.geometria_hash := md5(ST_AsEWKB(NEW.geometria));
+    END IF;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS parcelas_calcular_superficie ON parcelas;
+DROP FUNCTION IF EXISTS parcelas_calcular_superficie();
+
+DROP TRIGGER IF EXISTS parcelas_derivar_geometria ON parcelas;
+CREATE TRIGGER parcelas_derivar_geometria
+    BEFORE INSERT OR UPDATE OF geometria ON parcelas
+    FOR EACH ROW EXECUTE FUNCTION parcelas_derivar_geometria();
@@ -0,0 +1,14 @@
+-- migrate: no-transaction
+-- Indexes matching the keyset (cursor) pagination order of the list
+-- endpoints: newest first, id as tie-breaker. Scanned backwards for
+-- ORDER BY ts DESC, id DESC and for the (ts, id) < (cursor) row comparison.
+
+-- GET /parcelas: (created_at, id) per owner, active parcelas only
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_parcelas_activas_propietario_created_id
+    ON parcelas (propietario_id, created_at, id)
+    WHERE activa = true;
+
+-- GET /actividades: (fecha, id) per user. actividades is partitioned and
+-- CONCURRENTLY is not available there, so this build blocks writes to it.
+CREATE INDEX IF NOT EXISTS idx_actividades_usuario_fecha_id
+    ON actividades (usuario_id, fecha, id);
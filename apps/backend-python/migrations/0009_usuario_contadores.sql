@@ -0,0 +1,67 @@
+-- Per-user row counters for count=estimated on the list endpoints, kept on
+-- write by triggers so infinite-scroll clients never need a count(*).
+--
+--   parcelas     active parcelas per propietario_id
+--   actividades  actividades per usuario_id
+--
+-- Concurrent writes by the same user serialize briefly on their counter row.
+-- Counts are seeded here from the current tables.
+
+CREATE TABLE IF NOT EXISTS usuario_contadores (
+    usuario_id VARCHAR(255) NOT NULL,
+    entidad VARCHAR(32) NOT NULL,
+    total BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (usuario_id, entidad)
+);
+
+CREATE OR REPLACE FUNCTION usuario_contadores_ajustar(p_usuario_id text, p_entidad text, p_delta bigint) RETURNS void AS $$
+    INSERT INTO usuario_contadores (usuario_id, entidad, total)
+    VALUES (p_usuario_id, p_entidad, p_delta)
+    ON CONFLICT (usuario_id, entidad) DO UPDATE SET total = usuario_contadores.total + EXCLUDED.total;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION parcelas_contar() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.activa IS TRUE THEN
+        PERFORM usuario_contadores_ajustar(OLD.propietario_id, 'parcelas', -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.activa IS TRUE THEN
+        PERFORM usuario_contadores_ajustar(NEW.propietario_id, 'parcelas', 1);
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+-- A cross-partition UPDATE fires DELETE then INSERT, which cancel out. Rows
+-- moved by partition maintenance are skipped instead (migrations/0010).
+CREATE OR REPLACE FUNCTION actividades_contar() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM usuario_contadores_ajustar(OLD.usuario_id, 'actividades', -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM usuario_contadores_ajustar(NEW.usuario_id, 'actividades', 1);
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS parcelas_contar ON parcelas;
+CREATE TRIGGER parcelas_contar
+    AFTER INSERT OR DELETE OR UPDATE OF activa, propietario_id ON parcelas
+    FOR EACH ROW EXECUTE FUNCTION parcelas_contar();
+
+DROP TRIGGER IF EXISTS actividades_contar ON actividades;
+CREATE TRIGGER actividades_contar
+    AFTER INSERT OR DELETE OR UPDATE OF usuario_id ON actividades
+    FOR EACH ROW EXECUTE FUNCTION actividades_contar();
+
+-- Seed. CREATE TRIGGER holds a lock that blocks writes to both tables until
+-- this migration commits, so no write is missed or counted twice.
+INSERT INTO usuario_contadores (usuario_id, entidad, total)
+SELECT propietario_id, 'parcelas', count(*) FROM parcelas WHERE activa IS TRUE GROUP BY propietario_id
+ON CONFLICT (usuario_id, entidad) DO UPDATE SET total = EXCLUDED.total;
+
+INSERT INTO usuario_contadores (usuario_id, entidad, total)
+SELECT usuario_id, 'actividades', count(*) FROM actividades GROUP BY usuario_id
+ON CONFLICT (usuario_id, entidad) DO UPDATE SET total = EXCLUDED.total;
@@ -0,0 +1,36 @@
+-- Keep the actividades counters (migrations/0009) exact across partition
+-- maintenance.
+--
+-- actividades_contar is cloned onto every partition, so draining
+-- actividades_default into a new, not yet attached partition fired -1 per
+-- moved row with no matching +1. app/database/partitions.py now sets
+-- cuaderno.contadores_pausados for the duration of the move, which the
+-- trigger honours, and subtracts the rows of a partition it detaches.
+--
+-- Counters that already drifted are re-seeded from the table.
+
+CREATE OR REPLACE FUNCTION actividades_contar() RETURNS trigger AS $$
+BEGIN
+    -- Rows moved by partition maintenance are neither new nor deleted
+    IF current_setting('cuaderno.contadores_pausados', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM usuario_contadores_ajustar(OLD.usuario_id, 'actividades', -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM usuario_contadores_ajustar(NEW.usuario_id, 'actividades', 1);
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+-- Block actividades writes until this migration commits, so the re-seed
+-- neither misses nor double counts a concurrent write
+LOCK TABLE actividades IN SHARE MODE;
+
+UPDATE usuario_contadores SET total = 0 WHERE entidad = 'actividades';
+
+INSERT INTO usuario_contadores (usuario_id, entidad, total)
+SELECT usuario_id, 'actividades', count(*) FROM actividades GROUP BY usuario_id
+ON CONFLICT (usuario_id, entidad) DO UPDATE SET total = EXCLUDED.total;
@@ -0,0 +1,19 @@
+-- Let the derived-geometry recompute (app/database/parcela_geometry.py) skip
+-- the updated_at bump without DDL.
+--
+-- The job used to disable update_parcelas_updated_at around every batch,
+-- which locks parcelas against writes for the batch, needs table ownership
+-- and invalidates every connection's cached plans. Instead it now sets
+-- cuaderno.recalculo for its own transaction, which this function honours:
+-- derived columns are not a change sync clients need to pull again.
+
+CREATE OR REPLACE FUNCTION update_updated_at_column()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF current_setting('cuaderno.recalculo', true) = 'on' THEN
+        RETURN NEW;
+    END IF;
+    NEW.updated_at = CURRENT_TIMESTAMP;
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
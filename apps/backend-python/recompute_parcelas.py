@@ -0,0 +1,32 @@
+"""
+Recompute trigger-maintained parcela columns in batches
+
+    python recompute_parcelas.py                    # every parcela
+    python recompute_parcelas.py --user user_123    # one user's parcelas
+    python recompute_parcelas.py --organizacion org_1 --batch-size 1000
+"""
+import argparse
+import asyncio
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.config.settings import settings
+from app.database.parcela_geometry import recompute_parcelas
+from loguru import logger
+
+async def main(user_id: str, organizacion_id: str, batch_size: int):
+    """Run the recompute job against the configured database"""
+    engine = create_async_engine(settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://"))
+    try:
+        result = await recompute_parcelas(engine, user_id, organizacion_id, batch_size)
+        logger.success(f"Recomputed {result['scanned']} parcelas, {result['updated']} changed")
+    finally:
+        await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute trigger-maintained parcela columns")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--user", dest="user_id", default=None)
+    target.add_argument("--organizacion", dest="organizacion_id", default=None)
+    parser.add_argument("--batch-size", type=int, default=500)
+    options = parser.parse_args()
+    
+    asyncio.run(main(options.user_id, options.organizacion_id, options.batch_size))
\ No newline at end of file
@@ -0,0 +1,5 @@
+#!/bin/bash
+# Allow streaming replication connections to the primary (docker-compose.replica.yml)
+set -e
+
+echo "host replication all all scram-sha-256" >> "$PGDATA/pg_hba.conf"